@@ -1,16 +1,53 @@
 from typing import TypedDict
 from langgraph.graph import StateGraph, END
-from gcal import check_availability, book_appointment
+from calendars import get_calendar
 from utils import (
-    get_user_intent,
-    extract_slots,
+    SEARCH_DAYS,
+    listing_window,
+    merge_entities,
+    move_to_date,
+    resolve_entities,
     suggest_alternative,
     _format_time_friendly,
     is_business_hours
 )
+from conversation import message_features, prior_date, remember_message, seen
+from metrics import TURNS, instrument_node
+from prefetch import cancel_unneeded, prefetch_days, prefetch_slot_days
+from recurrence import build_series, exclude
+from reservations import (
+    book_reserved,
+    book_series_reserved,
+    hold_slot,
+    hold_slots,
+    new_hold_id,
+    release_slot,
+    release_slots
+)
+from resilience import CalendarUnavailable, stale_reads
+from runtime import (
+    REQUEST_TIMEOUT,
+    concurrency_limit,
+    end_turn,
+    report_progress,
+    run_io,
+    run_parse,
+    set_progress_listener,
+    start_turn,
+    turn_cancelled
+)
+import asyncio
+import logging
 import re
 import datetime
 
+logger = logging.getLogger(__name__)
+
+STALE_NOTE = (
+    "\n\n_Google Calendar is responding slowly, so this is based on "
+    "calendar data from the last few minutes._"
+)
+
 class AgentState(TypedDict):
     user_input: str
     intent: str
@@ -21,50 +58,65 @@ class AgentState(TypedDict):
     waiting_for: str
     last_booked: dict
     conversation_history: list
-    pending_date: str
+    intent_flags: dict
+    date_entities: list
+    turn_features: dict
+    pending_date: dict
+    calendar_ids: list
     last_suggested_alternatives: list
 
 def recognize_intent(state: AgentState) -> AgentState:
     if state.get("completed"):
         return state
 
-    conversation_context = " ".join(state.get("conversation_history", []))
-    full_context = f"{conversation_context} {state['user_input']}".lower()
+    features = _turn_features(state)
 
-    if "same time" in full_context and state.get("last_booked"):
+    if seen(state, features, "same_time") and state.get("last_booked"):
         state["context"]["reference_slot"] = state["last_booked"]
         state["intent"] = "book"
         return state
 
-    if re.search(r'\b(book|schedule|appointment|meeting)\b', full_context):
+    # "What's free next week?" lists open time unless a specific time is named
+    if features["intent"] == "list_availability" and not features["mentions_time"]:
+        state["intent"] = "list_availability"
+        return state
+
+    if seen(state, features, "book"):
         state["intent"] = "book"
-    elif re.search(r'\b(free|available|availability|open)\b', full_context):
+    elif seen(state, features, "availability"):
+        state["intent"] = "check_availability"
+    elif seen(state, features, "day"):
         state["intent"] = "check_availability"
     else:
-        if any(word in full_context for word in ["tomorrow", "monday", "tuesday", "wednesday",
-                                                 "thursday", "friday", "saturday", "sunday"]):
-            state["intent"] = "check_availability"
-        else:
-            state["intent"] = get_user_intent(state["user_input"])
+        state["intent"] = features["intent"]
 
     return state
 
+def _turn_features(state: AgentState) -> dict:
+    features = state.get("turn_features")
+    if features is None:
+        features = state["turn_features"] = message_features(state["user_input"])
+    return features
+
 def handle_booking(state: AgentState) -> AgentState:
     state.setdefault("context", {})
-    state.setdefault("conversation_history", [])
-    state["conversation_history"].append(state["user_input"])
+    features = remember_message(state, state["user_input"], _turn_features(state))
 
-    if re.search(r'\b(start over|reset|begin again)\b', state["user_input"].lower()):
+    if features["reset"]:
         _reset_state(state)
         state["response"] = "Okay, let's start fresh. How can I help?"
         return state
 
-    if re.search(r'\b(cancel|stop|never mind)\b', state["user_input"].lower()):
+    if features["cancel"]:
         _reset_state(state)
         state["response"] = "Booking canceled. What would you like to do next?"
         return state
 
     try:
+        # "Every Tuesday at 3 PM" starts a series, whatever was pending
+        rule = None if features["confirmation"] else features["recurrence"]
+        if rule:
+            return _handle_series(state, rule)
         if state.get("waiting_for") == "confirmation":
             return _handle_confirmation(state)
         if state.get("waiting_for") == "time_range":
@@ -77,26 +129,184 @@ def handle_booking(state: AgentState) -> AgentState:
 
         return _handle_unknown_intent(state)
 
+    except CalendarUnavailable as e:
+        return _handle_calendar_unavailable(state, e)
     except Exception as e:
         return _handle_error(state, e)
 
-def _handle_confirmation(state: AgentState) -> AgentState:
-    user_input = state["user_input"].strip().lower()
+def list_availability(state: AgentState) -> AgentState:
+    state.setdefault("context", {})
+    remember_message(state, state["user_input"], _turn_features(state))
+    # Listing replaces whatever slot was awaiting confirmation
+    _release_hold(state)
+    state["context"].pop("pending_booking", None)
+    try:
+        start_dt, end_dt = listing_window(state["user_input"])
+        duration = _turn_features(state)["entities"]["duration"] or 30
+        report_progress("checking", "Checking your calendar for open time...")
+        with stale_reads() as stale:
+            blocks = get_calendar().list_free_blocks(
+                start_dt, end_dt, duration, calendar_ids=state.get("calendar_ids")
+            ) if start_dt < end_dt else []
+    except CalendarUnavailable as e:
+        return _handle_calendar_unavailable(state, e)
+    except Exception as e:
+        return _handle_error(state, e)
+
+    state["waiting_for"] = "time_range"
+    if not blocks:
+        state["response"] = f"I couldn't find {duration} free minutes in that range. Would you like to try other days?"
+        return state
+    state["response"] = (
+        f"Here's when you're free:\n{_describe_blocks(blocks)}\n\n"
+        "Which time would you like to book? (e.g., 'Tuesday at 3 PM')"
+    )
+    if stale:
+        state["response"] += STALE_NOTE
+    return state
+
+def _describe_blocks(blocks: list) -> str:
+    days = {}
+    for block in blocks:
+        start = datetime.datetime.fromisoformat(block["start"])
+        end = datetime.datetime.fromisoformat(block["end"])
+        days.setdefault(start.strftime("%A, %B %d"), []).append(
+            f"{start.strftime('%I:%M %p')}–{end.strftime('%I:%M %p')}"
+        )
+    return "\n".join(f"• {day}: {', '.join(spans)}" for day, spans in days.items())
+
+def _handle_series(state: AgentState, rule: dict) -> AgentState:
+    # The entities were parsed from the text left once the repeat phrases are removed
+    slots = resolve_entities(_turn_features(state)["entities"])
+    if not slots:
+        state["response"] = (
+            "What time should the series be at? Try one of these:\n"
+            "• 'Every Tuesday at 3 PM for 8 weeks'\n"
+            "• 'Every weekday at 9:30 AM until 30 October'"
+        )
+        state["waiting_for"] = "time_range"
+        return state
+
+    series = build_series(rule, slots)
+    if not series["occurrences"]:
+        state["response"] = "That series has no dates left. Please pick a later end date."
+        return state
+    if not is_business_hours(series["slots"]):
+        state["response"] = "⏰ That time is outside business hours. Please pick a time during the working day."
+        state["waiting_for"] = "time_range"
+        return state
+
+    _release_hold(state)
+    state["context"].pop("pending_booking", None)
+    total = len(series["occurrences"])
+    report_progress("checking", f"Checking {total} occurrences...")
+    with stale_reads() as stale:
+        conflicts = get_calendar().find_series_conflicts(series["occurrences"], state.get("calendar_ids"))
+
+    first = _format_time_friendly(series["occurrences"][0]["start"])
+    last_day = datetime.datetime.fromisoformat(series["occurrences"][-1]["start"]).strftime("%B %d")
+    summary = f"{total} meetings from {first} to {last_day}"
+    if len(conflicts) == total:
+        state["response"] = f"⏰ All {summary} clash with existing events. Please try another time."
+        state["waiting_for"] = "time_range"
+    else:
+        if conflicts:
+            clashing = ", ".join(
+                datetime.datetime.fromisoformat(series["occurrences"][i]["start"]).strftime("%a %b %d")
+                for i in conflicts
+            )
+            series = exclude(series, conflicts)
+            state["response"] = (
+                f"Of {summary}, {len(conflicts)} clash with existing events ({clashing}). "
+                f"Book the other {total - len(conflicts)}? (yes/no)"
+            )
+        else:
+            state["response"] = f"You're free for all {summary}. Book the series? (yes/no)"
+        if not series["bounded"]:
+            state["response"] += f"\n\nNo end was given, so this covers the next {total}; add 'for 8 weeks' or 'until 20 December' to change it."
+        # Held like a single slot, so no other session is offered these times meanwhile
+        hold_ids = hold_slots(series["occurrences"])
+        if hold_ids is None:
+            state["response"] = "⏳ Someone else is booking one of those times. Please try another time."
+            state["waiting_for"] = "time_range"
+        else:
+            state["context"]["series_hold_ids"] = hold_ids
+            state["context"]["booking_key"] = new_hold_id()
+            state["context"]["pending_series"] = series
+            state["context"]["confirmation_prompt"] = state["response"]
+            state["waiting_for"] = "confirmation"
+    if stale:
+        state["response"] += STALE_NOTE
+    return state
+
+def _confirm_series(state: AgentState, confirmation: str) -> AgentState:
+    series = state["context"]["pending_series"]
+    if confirmation == "no":
+        state["context"].pop("pending_series")
+        _release_hold(state)
+        state["response"] = "Okay, let's try another time. What would you prefer?"
+        state["waiting_for"] = "time_range"
+        return state
 
-    if user_input in ["yes", "y", "yeah", "sure", "ok", "confirm"]:
-        if book_appointment(state["context"]["pending_booking"]):
-            booked_time = _format_time_friendly(state["context"]["pending_booking"]["start"])
+    if _abandoned(state):
+        return state
+    count = len(series["occurrences"])
+    key = state["context"].setdefault("booking_key", new_hold_id())
+    report_progress("booking", f"Booking {count} meetings...")
+    status = book_series_reserved(
+        get_calendar(), series, state["context"].pop("series_hold_ids", None), key, state.get("calendar_ids")
+    )
+    if status == "booked":
+        first = _format_time_friendly(series["occurrences"][0]["start"])
+        state["response"] = f"✅ Booked! {count} meetings are scheduled, starting {first}.\n\nWould you like to book something else?"
+        state["last_booked"] = series["slots"]
+        _reset_state(state)
+    elif status == "pending":
+        state["response"] = "⏳ Your booking is still being processed. Please confirm again in a moment."
+    elif status == "taken":
+        state["context"].pop("pending_series")
+        state["response"] = "⚠️ Some of those times were just taken. Please try again to see what is still free."
+        state["waiting_for"] = "time_range"
+    else:
+        state["context"].pop("pending_series")
+        state["response"] = "⚠️ Booking failed. Please try a different time."
+        state["waiting_for"] = "time_range"
+    return state
+
+def _handle_confirmation(state: AgentState) -> AgentState:
+    confirmation = _turn_features(state)["confirmation"]
+
+    if confirmation and state["context"].get("pending_series"):
+        return _confirm_series(state, confirmation)
+
+    if confirmation == "yes":
+        if _abandoned(state):
+            return state
+        pending = state["context"]["pending_booking"]
+        # The key survives a retried request whose first attempt already booked
+        key = state["context"].setdefault("booking_key", new_hold_id())
+        report_progress("booking", f"Booking {_format_time_friendly(pending['start'])}...")
+        status = book_reserved(
+            get_calendar(), pending, state["context"].pop("hold_id", None), key, state.get("calendar_ids")
+        )
+        if status == "booked":
+            booked_time = _format_time_friendly(pending["start"])
             state["response"] = f"✅ Booked! Your meeting is scheduled for {booked_time}.\n\nWould you like to book something else?"
-            state["last_booked"] = state["context"]["pending_booking"]
+            state["last_booked"] = pending
             _reset_state(state)
+        elif status == "pending":
+            state["response"] = "⏳ Your booking is still being processed. Please confirm again in a moment."
+        elif status == "taken":
+            return _offer_alternatives(state, pending, "⚠️ That time was just taken.")
         else:
             state["response"] = "⚠️ Booking failed. Please try a different time."
             state["waiting_for"] = "time_range"
-    elif user_input in ["no", "n", "nope", "cancel"]:
+    elif confirmation == "no":
+        _release_hold(state)
         state["response"] = "Okay, let's try another time. What would you prefer?"
         state["waiting_for"] = "time_range"
     else:
-        possible_slots = extract_slots(state["user_input"])
+        possible_slots = _follow_up_slots(state)
         if possible_slots:
             state["waiting_for"] = "time_range"
             return _process_slots(state, possible_slots)
@@ -109,37 +319,46 @@ def _handle_confirmation(state: AgentState) -> AgentState:
 
     return state
 
+def _match_suggested_slot(state: AgentState):
+    """Return the suggested slot the user picked by its label or time of day, if any."""
+    user_input_clean = re.sub(r'[\s:,-]', '', state["user_input"].lower())
+    if not user_input_clean:
+        return None
+    suggested = state["context"].get("suggested_slots", [])
+    for alt, slot in zip(state.get("last_suggested_alternatives", []), suggested):
+        start_dt = datetime.datetime.fromisoformat(slot["start"])
+        labels = [alt, start_dt.strftime('%I:%M %p'), start_dt.strftime('%I %p')]
+        for label in labels:
+            # Whole labels only: "2pm" is inside "12pm"
+            label_clean = re.sub(r'[\s:,-]', '', label.lower())
+            if user_input_clean in (label_clean, label_clean.lstrip('0')):
+                return slot
+
+    # "Tomorrow at 2 PM": compare the parsed time, and the day if one is named
+    entities = _turn_features(state)["entities"]
+    if entities["time"] is None:
+        return None
+    for slot in suggested:
+        start_dt = datetime.datetime.fromisoformat(slot["start"])
+        if entities["date"]:
+            picked = resolve_entities(entities, slot.get("timezone", "Asia/Kolkata"))
+            if picked and datetime.datetime.fromisoformat(picked["start"]) == start_dt:
+                return slot
+        elif (start_dt.hour, start_dt.minute) == tuple(entities["time"]):
+            return slot
+    return None
+
 def _handle_time_range(state: AgentState) -> AgentState:
     if state.get("last_suggested_alternatives"):
-        user_input_clean = re.sub(r'[\s:-]', '', state["user_input"].lower())
-        for alt in state["last_suggested_alternatives"]:
-            alt_clean = re.sub(r'[\s:-]', '', alt.lower())
-            if user_input_clean == alt_clean or user_input_clean in alt_clean:
-                slots = extract_slots(alt)
-                if slots:
-                    return _process_slots(state, slots)
-
-    if "same time" in state["user_input"].lower() and state.get("last_booked"):
-        slots = state["last_booked"].copy()
-        if "tomorrow" in state["user_input"].lower():
-            new_date = datetime.datetime.now() + datetime.timedelta(days=1)
-            slots["start"] = slots["start"].replace(day=new_date.day, month=new_date.month, year=new_date.year)
-        return _process_slots(state, slots)
-
-    combined_input = state["user_input"]
-    if state.get("pending_date"):
-        combined_input = f"{state['pending_date']} {state['user_input']}"
-        state["pending_date"] = None
-
-    slots = extract_slots(combined_input)
+        slots = _match_suggested_slot(state)
+        if slots:
+            return _process_slots(state, dict(slots))
 
-    if not slots:
-        for msg in reversed(state.get("conversation_history", [])):
-            if "next" in msg.lower() or "week" in msg.lower() or "friday" in msg.lower():
-                retry_input = f"{msg} {state['user_input']}"
-                slots = extract_slots(retry_input)
-                if slots:
-                    break
+    if _turn_features(state)["same_time"] and state.get("last_booked"):
+        return _process_slots(state, _same_time(state))
+
+    pending_date, state["pending_date"] = state.get("pending_date"), None
+    slots = _follow_up_slots(state, pending_date)
 
     if not slots:
         state["response"] = (
@@ -155,50 +374,105 @@ def _handle_time_range(state: AgentState) -> AgentState:
 def _handle_availability(state: AgentState) -> AgentState:
     if "tomorrow" in state["user_input"].lower() and not re.search(r'\d', state["user_input"]):
         state["context"]["date"] = "tomorrow"
+        state["pending_date"] = _turn_features(state)["entities"]["date"]
         state["waiting_for"] = "time_range"
+        # The reply will be a time tomorrow; fetch the day while the user types
+        state["context"]["prefetched"] = prefetch_days(1, calendar_ids=state.get("calendar_ids"))
         state["response"] = "What time tomorrow? (e.g., 'morning', 'afternoon' or '2 PM')"
         return state
 
-    slots = extract_slots(state["user_input"])
+    slots = resolve_entities(_turn_features(state)["entities"])
     return _process_slots(state, slots) if slots else _request_better_input(state)
 
 def _handle_booking_request(state: AgentState) -> AgentState:
-    if "same time" in state["user_input"].lower() and state.get("last_booked"):
-        return _process_slots(state, state["last_booked"].copy())
-
-    slots = extract_slots(state["user_input"])
-
-    if not slots:
-        prior_date = next((msg for msg in reversed(state["conversation_history"])
-                          if any(d in msg.lower() for d in ["monday", "tuesday", "friday", "next week", "tomorrow"])), "")
-        if prior_date:
-            slots = extract_slots(f"{prior_date} {state['user_input']}")
+    if _turn_features(state)["same_time"] and state.get("last_booked"):
+        return _process_slots(state, _same_time(state))
 
+    slots = _follow_up_slots(state)
     return _process_slots(state, slots) if slots else _request_better_input(state)
 
+def _follow_up_slots(state: AgentState, pending_date: dict = None):
+    """Slots this message names, taking the day from earlier in the conversation if it names none."""
+    features = _turn_features(state)
+    date = pending_date or prior_date(state, features)
+    return resolve_entities(merge_entities(features["entities"], date))
+
+def _same_time(state: AgentState) -> dict:
+    """The last booked time, moved to the day this message names ("same time tomorrow")."""
+    date = _turn_features(state)["entities"]["date"]
+    return move_to_date(state["last_booked"], date) if date else dict(state["last_booked"])
+
+def _offer_alternatives(state: AgentState, slots: dict, reason: str) -> AgentState:
+    report_progress("alternatives", f"{reason} Looking for nearby free times...")
+    alternatives = get_calendar().find_alternatives(slots, calendar_ids=state.get("calendar_ids"))
+    alt = suggest_alternative(alternatives)
+    state["response"] = f"{reason} How about {alt}?"
+    state["waiting_for"] = "time_range"
+    state["last_suggested_alternatives"] = [
+        _format_time_friendly(slot["start"]) for slot in alternatives
+    ]
+    state["context"]["suggested_slots"] = alternatives
+    state["context"]["prefetched"] = prefetch_slot_days(alternatives, state.get("calendar_ids"))
+    return state
+
 def _process_slots(state: AgentState, slots: dict) -> AgentState:
-    print("[DEBUG] Booking slots:", slots)
+    # Days fetched for a guessed reply are wasted work once the user names another
+    cancel_unneeded(state["context"].pop("prefetched", []), slots, state.get("calendar_ids"))
+    with stale_reads() as stale:
+        state = _check_slots(state, slots)
+    if stale:
+        state["response"] += STALE_NOTE
+    return state
+
+def _check_slots(state: AgentState, slots: dict) -> AgentState:
+    logger.debug("Booking slots: %s", slots)
+    _release_hold(state)
 
     if not is_business_hours(slots):
-        alt = suggest_alternative(slots)
-        state["response"] = f"⏰ That time is outside business hours. How about {alt}?"
-        state["waiting_for"] = "time_range"
-        state["last_suggested_alternatives"] = [alt]
-        return state
+        return _offer_alternatives(state, slots, "⏰ That time is outside business hours.")
 
-    if check_availability(slots):
+    # Hold the slot before checking so two sessions are never both offered it
+    hold_id = hold_slot(slots)
+    if hold_id is None:
+        return _offer_alternatives(state, slots, "⏳ Someone else is booking that time.")
+
+    friendly = _format_time_friendly(slots["start"])
+    report_progress("checking", f"Checking {friendly}...", start=slots["start"], end=slots["end"])
+    try:
+        available = get_calendar().check_availability(slots, state.get("calendar_ids"))
+    except Exception:
+        # Not stored in the context yet, so nothing else would release it
+        release_slot(hold_id)
+        raise
+    report_progress("availability", f"{friendly} is {'free' if available else 'taken'}.", available=available)
+    if available:
+        state["context"].pop("pending_series", None)
+        state["context"]["hold_id"] = hold_id
+        state["context"]["booking_key"] = new_hold_id()
         state["context"]["pending_booking"] = slots
         state["waiting_for"] = "confirmation"
-        friendly = _format_time_friendly(slots["start"])
         state["response"] = f"You're free on {friendly}. Book it? (yes/no)"
         state["context"]["confirmation_prompt"] = state["response"]
-    else:
-        alt = suggest_alternative(slots)
-        state["waiting_for"] = "time_range"
-        state["response"] = f"⏰ Unavailable at that time. How about {alt}?"
-        state["last_suggested_alternatives"] = [alt]
+        return state
 
-    return state
+    release_slot(hold_id)
+    return _offer_alternatives(state, slots, "⏰ Unavailable at that time.")
+
+def _release_hold(state: AgentState) -> None:
+    context = state.get("context", {})
+    release_slot(context.pop("hold_id", None))
+    release_slots(context.pop("series_hold_ids", None))
+
+def _abandoned(state: AgentState) -> bool:
+    """
+    True if the caller already timed out: nobody would see this turn's
+    reply, so book nothing and free the slot for the retry.
+    """
+    if not turn_cancelled():
+        return False
+    _release_hold(state)
+    state["response"] = "⚠️ The request timed out before booking. Please try again."
+    return True
 
 def _request_better_input(state: AgentState) -> AgentState:
     state["response"] = (
@@ -213,9 +487,11 @@ def _handle_unknown_intent(state: AgentState) -> AgentState:
     if state["conversation_history"] and "book" in state["conversation_history"][-1].lower():
         state["response"] = "When would you like to book? (e.g., 'Tomorrow 3PM')"
         state["waiting_for"] = "time_range"
+        state["context"]["prefetched"] = prefetch_days(0, SEARCH_DAYS + 1, state.get("calendar_ids"))
     elif state["conversation_history"] and "available" in state["conversation_history"][-1].lower():
         state["response"] = "When should I check? (e.g., 'Friday afternoon')"
         state["waiting_for"] = "time_range"
+        state["context"]["prefetched"] = prefetch_days(0, SEARCH_DAYS + 1, state.get("calendar_ids"))
     else:
         state["response"] = (
             "I can help with:\n"
@@ -229,6 +505,15 @@ def _handle_unknown_intent(state: AgentState) -> AgentState:
     state["completed"] = True
     return state
 
+def _handle_calendar_unavailable(state: AgentState, error: Exception) -> AgentState:
+    # Keep the conversation where it was so the user can simply retry
+    logger.warning("Calendar unavailable: %s", error)
+    state["response"] = (
+        "⚠️ Google Calendar isn't responding right now, so I can't check or book. "
+        "Please try again in a minute."
+    )
+    return state
+
 def _handle_error(state: AgentState, error: Exception) -> AgentState:
     state["response"] = (
         "⚠️ I encountered an issue: " + str(error) + "\n\n"
@@ -238,6 +523,7 @@ def _handle_error(state: AgentState, error: Exception) -> AgentState:
     return state
 
 def _reset_state(state: AgentState) -> None:
+    _release_hold(state)
     state.update({
         "completed": True,
         "waiting_for": "",
@@ -246,35 +532,153 @@ def _reset_state(state: AgentState) -> None:
         "last_suggested_alternatives": []
     })
 
-workflow = StateGraph(AgentState)
-workflow.add_node("recognize_intent_node", recognize_intent)
-workflow.add_node("handle_booking_node", handle_booking)
-workflow.set_entry_point("recognize_intent_node")
-workflow.add_edge("recognize_intent_node", "handle_booking_node")
-workflow.add_edge("handle_booking_node", END)
-graph = workflow.compile()
-
-def run_agent(user_input: str, state: dict) -> dict:
+async def arecognize_intent(state: AgentState) -> AgentState:
+    # The one parse of the message may reach dateparser; keep it off the event loop
+    if state.get("turn_features") is None:
+        state["turn_features"] = await run_parse(message_features, state["user_input"])
+    return recognize_intent(state)
+
+async def alist_availability(state: AgentState) -> AgentState:
+    return await run_io(list_availability, state)
+
+async def ahandle_booking(state: AgentState) -> AgentState:
+    # Run the blocking handler (Calendar I/O included) on the bounded I/O pool
+    return await run_io(handle_booking, state)
+
+def _route(state: AgentState) -> str:
+    if state.get("intent") == "list_availability":
+        return "list_availability_node"
+    return "handle_booking_node"
+
+def _build_graph(intent_node, booking_node, listing_node):
+    workflow = StateGraph(AgentState)
+    workflow.add_node("recognize_intent_node", instrument_node("recognize_intent_node", intent_node))
+    workflow.add_node("handle_booking_node", instrument_node("handle_booking_node", booking_node))
+    workflow.add_node("list_availability_node", instrument_node("list_availability_node", listing_node))
+    workflow.set_entry_point("recognize_intent_node")
+    workflow.add_conditional_edges("recognize_intent_node", _route)
+    workflow.add_edge("handle_booking_node", END)
+    workflow.add_edge("list_availability_node", END)
+    return workflow.compile()
+
+graph = _build_graph(recognize_intent, handle_booking, list_availability)
+async_graph = _build_graph(arecognize_intent, ahandle_booking, alist_availability)
+
+def _prepare_state(user_input: str, state: dict, calendar_ids: list = None) -> dict:
+    # Calendars to schedule across carry over between conversations unless replaced
+    calendar_ids = list(calendar_ids or (state or {}).get("calendar_ids") or [])
     if not state or state.get("completed"):
+        # So is the last booking, for "same time tomorrow", and the days
+        # prefetched for this reply, so the reply can cancel what it does not need
+        last_booked = (state or {}).get("last_booked")
+        prefetched = (state or {}).get("context", {}).get("prefetched")
         state = {
             "user_input": user_input,
             "intent": "",
             "slots": {},
             "response": "",
             "completed": False,
-            "context": {},
+            "context": {"prefetched": prefetched} if prefetched else {},
             "waiting_for": "",
-            "last_booked": None,
+            "last_booked": last_booked,
             "conversation_history": [],
+            "intent_flags": {},
+            "date_entities": [],
+            "turn_features": None,
             "pending_date": None,
             "last_suggested_alternatives": []
         }
     else:
         state["user_input"] = user_input
         state["completed"] = False
+        state["turn_features"] = None
+    state["calendar_ids"] = calendar_ids
+    return state
+
+def _count_turn(waiting_for: str, updated_state: dict) -> None:
+    TURNS.inc(intent=updated_state.get("intent") or "none", waiting_for=waiting_for or "none")
 
+def run_agent(user_input: str, state: dict, calendar_ids: list = None) -> dict:
+    """
+    Run one turn. `calendar_ids` lists the calendars that must all be free
+    (default: the configured calendar); it is remembered in the state.
+    """
+    state = _prepare_state(user_input, state, calendar_ids)
+    waiting_for = state.get("waiting_for")
     updated_state = graph.invoke(state)
+    _count_turn(waiting_for, updated_state)
+    return {
+        "response": updated_state["response"],
+        "state": updated_state
+    }
+
+async def arun_agent(user_input: str, state: dict, calendar_ids: list = None,
+                     timeout: float = REQUEST_TIMEOUT) -> dict:
+    """Async variant of run_agent; bounded by AGENT_MAX_CONCURRENCY and a per-turn timeout."""
+    state = _prepare_state(user_input, state, calendar_ids)
+    waiting_for = state.get("waiting_for")
+    cancelled, token = start_turn()
+    try:
+        # Waiting for a free slot counts against the timeout too, so an overload cannot queue turns forever
+        async with asyncio.timeout(timeout), concurrency_limit():
+            updated_state = await async_graph.ainvoke(state)
+    except BaseException:
+        # The handler may still be running on the I/O pool; stop it booking
+        cancelled.set()
+        raise
+    finally:
+        end_turn(token)
+    _count_turn(waiting_for, updated_state)
     return {
         "response": updated_state["response"],
         "state": updated_state
     }
+
+async def astream_agent(user_input: str, state: dict, calendar_ids: list = None,
+                        timeout: float = REQUEST_TIMEOUT):
+    """
+    Streaming variant of arun_agent: an async generator of (event, data) pairs.
+    "intent" follows intent recognition, "progress" marks each calendar step,
+    and "result" ({"response", "state"}) ends the turn. Closing the generator
+    early, e.g. when the client disconnects, cancels the turn.
+    """
+    state = _prepare_state(user_input, state, calendar_ids)
+    waiting_for = state.get("waiting_for")
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def emit(event: str, data) -> None:
+        # Called from the event loop and from worker threads alike
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    async def produce():
+        set_progress_listener(emit)
+        try:
+            final_state = state
+            async with asyncio.timeout(timeout), concurrency_limit():
+                async for mode, chunk in async_graph.astream(state, stream_mode=["updates", "values"]):
+                    if mode == "values":
+                        final_state = chunk
+                    elif "recognize_intent_node" in chunk:
+                        update = chunk["recognize_intent_node"]
+                        emit("intent", {"intent": update.get("intent"), "waiting_for": update.get("waiting_for")})
+            _count_turn(waiting_for, final_state)
+            emit("result", {"response": final_state["response"], "state": final_state})
+        except Exception as e:
+            emit("error", e)
+
+    # The task copies the flag with the rest of the context
+    cancelled, token = start_turn()
+    task = asyncio.create_task(produce())
+    end_turn(token)
+    try:
+        while True:
+            event, data = await events.get()
+            if event == "error":
+                raise data
+            yield event, data
+            if event == "result":
+                return
+    finally:
+        cancelled.set()
+        task.cancel()
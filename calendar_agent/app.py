@@ -1,34 +1,111 @@
 import streamlit as st
 import requests
-from fastapi import FastAPI, Request
-import uvicorn
-from agent import run_agent
+import json
+import os
 import threading
 import time
 
-# FastAPI app
-app = FastAPI()
+# Set BACKEND_URL to use a separately deployed API server (see server.py).
+# Without it the agent runs inside the Streamlit process: no HTTP hop and
+# no state serialization between the UI and the agent.
+BACKEND_URL = os.getenv("BACKEND_URL")
+# In-process mode can still serve the HTTP API for other clients
+SERVE_API = os.getenv("SERVE_API", "0") == "1"
+API_PORT = int(os.getenv("AGENT_PORT", "8000"))
 
-@app.post("/chat")
-async def chat(request: Request):
-    data = await request.json()
-    response = run_agent(data['user_input'], data.get('state', {}))
-    return response
+@st.cache_resource
+def start_api_server() -> bool:
+    """Serve the FastAPI app from a background thread, once per Streamlit process."""
+    import uvicorn
+    from backend import app
+    threading.Thread(
+        target=uvicorn.run, args=(app,), kwargs={"host": "127.0.0.1", "port": API_PORT}, daemon=True
+    ).start()
+    return True
 
-# Start FastAPI in background thread
-def start_fastapi():
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+@st.cache_resource
+def use_streamlit_secrets() -> bool:
+    """Give the in-process agent the app's st.secrets (e.g. on Streamlit Cloud)."""
+    import config
+    try:
+        config.set_secrets(st.secrets.to_dict())
+    except Exception:
+        # No secrets file; the agent falls back to its environment variables
+        return False
+    return True
+
+@st.cache_resource
+def http_session() -> requests.Session:
+    """One keep-alive connection pool shared by every browser session."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def wait_until_ready(timeout: float = 30.0) -> bool:
+    """Poll the backend's readiness endpoint instead of sleeping a fixed time."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if http_session().get(f"{BACKEND_URL}/readyz", timeout=1).status_code == 200:
+                return True
+        except requests.exceptions.ConnectionError:
+            pass
+        time.sleep(0.05)
+    return False
+
+def stream_chat(prompt: str, session_id, on_progress) -> dict:
+    """Send a message to /chat/stream, reporting progress events until the response arrives."""
+    with http_session().post(
+        f"{BACKEND_URL}/chat/stream",
+        json={"user_input": prompt, "session_id": session_id},
+        stream=True,
+        timeout=60
+    ) as resp:
+        resp.raise_for_status()
+        event = None
+        for line in resp.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event == "progress":
+                    on_progress(data["message"])
+                elif event == "response":
+                    return data
+    raise requests.exceptions.ConnectionError("Stream ended without a response")
+
+def remote_chat(prompt: str, on_progress) -> str:
+    response = stream_chat(prompt, st.session_state.session_id, on_progress)
+    st.session_state.session_id = response['session_id']
+    return response['response']
+
+def local_chat(prompt: str, on_progress) -> str:
+    """Run the agent in this process; the conversation state stays in st.session_state."""
+    from agent import run_agent
+    from runtime import reset_progress_listener, set_progress_listener
+    token = set_progress_listener(lambda event, data: on_progress(data["message"]))
+    try:
+        result = run_agent(prompt, st.session_state.agent_state)
+    finally:
+        reset_progress_listener(token)
+    st.session_state.agent_state = result["state"]
+    return result["response"]
 
 # Initialize Streamlit app
 st.title("📅 Calendar Booking Agent")
 st.caption("A conversational AI that helps you book appointments on Google Calendar")
 
-# Start FastAPI server
-if "fastapi_started" not in st.session_state:
-    st.session_state.fastapi_started = True
-    fastapi_thread = threading.Thread(target=start_fastapi, daemon=True)
-    fastapi_thread.start()
-    time.sleep(2)  # Give FastAPI time to start
+if BACKEND_URL:
+    if "backend_ready" not in st.session_state:
+        st.session_state.backend_ready = wait_until_ready()
+        if not st.session_state.backend_ready:
+            st.error("🔌 Backend did not become ready in time")
+else:
+    use_streamlit_secrets()
+    if SERVE_API:
+        start_api_server()
 
 # Initialize session state
 if "messages" not in st.session_state:
@@ -42,6 +119,7 @@ if "messages" not in st.session_state:
                    "   - 'Tomorrow morning'\n"
                    "   - 'Tomorrow at afternoon at 2 PM'"
     }]
+    st.session_state.session_id = None
     st.session_state.agent_state = {}
 
 # Display message history
@@ -49,37 +127,22 @@ for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
         st.markdown(msg["content"])
 
-# Process user input
+# Process user input; the new turn is drawn in place rather than by a full rerun
 if prompt := st.chat_input("Type your request..."):
     st.session_state.messages.append({"role": "user", "content": prompt})
-    
-    with st.spinner("Checking calendar..."):
-        try:
-            response = requests.post(
-                "http://127.0.0.1:8000/chat",
-                json={
-                    "user_input": prompt,
-                    "state": st.session_state.agent_state
-                },
-                timeout=60
-            ).json()
-            
-            st.session_state.agent_state = response['state']
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": response['response']
-            })
-        except requests.exceptions.ConnectionError:
-            error_msg = "🔌 Connection error: Backend service unavailable"
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": error_msg
-            })
-        except Exception as e:
-            error_msg = f"⚠️ Error: {str(e)}"
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": error_msg
-            })
-    
-    st.rerun()
+    with st.chat_message("user"):
+        st.markdown(prompt)
+
+    with st.chat_message("assistant"):
+        status = st.empty()
+        with st.spinner("Checking calendar..."):
+            try:
+                chat = remote_chat if BACKEND_URL else local_chat
+                reply = chat(prompt, status.caption)
+            except requests.exceptions.ConnectionError:
+                reply = "🔌 Connection error: Backend service unavailable"
+            except Exception as e:
+                reply = f"⚠️ Error: {str(e)}"
+        status.empty()
+        st.markdown(reply)
+    st.session_state.messages.append({"role": "assistant", "content": reply})
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytz
+from utils import BUSINESS_END, BUSINESS_START
+
+# Resolution of the availability bitmap
+CELL_MINUTES = 15
+CELLS_PER_DAY = 24 * 60 // CELL_MINUTES
+
+def _cell_offsets(times: list, origin: datetime, user_tz) -> np.ndarray:
+    """Minutes of local wall-clock time since `origin` (naive local midnight)."""
+    return np.array(
+        [(t.astimezone(user_tz).replace(tzinfo=None) - origin).total_seconds() / 60 for t in times],
+        dtype=np.float64
+    )
+
+def busy_bitmap(busy: list, origin: datetime, days: int, user_tz) -> np.ndarray:
+    """
+    Rasterize busy (start, end) datetimes into a (days, CELLS_PER_DAY) boolean
+    grid starting at local midnight `origin`. A cell touched by any busy
+    interval is busy.
+    """
+    cells = days * CELLS_PER_DAY
+    if not busy:
+        return np.zeros((days, CELLS_PER_DAY), dtype=bool)
+    starts = np.floor(_cell_offsets([s for s, _ in busy], origin, user_tz) / CELL_MINUTES)
+    ends = np.ceil(_cell_offsets([e for _, e in busy], origin, user_tz) / CELL_MINUTES)
+    starts = np.clip(starts, 0, cells).astype(np.int64)
+    ends = np.clip(ends, 0, cells).astype(np.int64)
+    # Difference array: +1 where an interval opens, -1 where it closes
+    edges = np.zeros(cells + 1, dtype=np.int32)
+    np.add.at(edges, starts, 1)
+    np.add.at(edges, ends, -1)
+    return (np.cumsum(edges[:-1]) > 0).reshape(days, CELLS_PER_DAY)
+
+def business_mask(days: int) -> np.ndarray:
+    """Cells inside business hours on every day (see utils.is_business_hours)."""
+    hours = np.arange(CELLS_PER_DAY) * CELL_MINUTES // 60
+    day_mask = (hours >= BUSINESS_START) & (hours < BUSINESS_END)
+    return np.broadcast_to(day_mask, (days, CELLS_PER_DAY))
+
+def free_blocks(busy: list, range_start: datetime, range_end: datetime, duration: int = 30,
+                timezone: str = "Asia/Kolkata") -> list:
+    """
+    Contiguous free blocks of at least `duration` minutes inside business
+    hours between `range_start` and `range_end`, from one bitmap scan.
+    Each block is a slots dict ({"start", "end", "timezone"}) covering the
+    whole free run, in chronological order.
+    """
+    user_tz = pytz.timezone(timezone)
+    local_start = range_start.astimezone(user_tz).replace(tzinfo=None)
+    local_end = range_end.astimezone(user_tz).replace(tzinfo=None)
+    origin = local_start.replace(hour=0, minute=0, second=0, microsecond=0)
+    days = (local_end.date() - origin.date()).days + 1
+
+    free = business_mask(days) & ~busy_bitmap(busy, origin, days, user_tz)
+    flat = free.ravel().copy()
+    # Cells partly before the range start or after its end are not offered
+    first = int(np.ceil((local_start - origin).total_seconds() / 60 / CELL_MINUTES))
+    last = int((local_end - origin).total_seconds() // 60 // CELL_MINUTES)
+    flat[:max(first, 0)] = False
+    flat[max(last, 0):] = False
+
+    # Run-length scan: rising and falling edges of the free mask
+    edges = np.diff(np.concatenate(([0], flat.view(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    needed = -(-duration // CELL_MINUTES)
+    keep = (run_ends - run_starts) >= needed
+
+    cell = timedelta(minutes=CELL_MINUTES)
+    return [
+        {
+            "start": user_tz.localize(origin + int(s) * cell).isoformat(),
+            "end": user_tz.localize(origin + int(e) * cell).isoformat(),
+            "timezone": timezone
+        }
+        for s, e in zip(run_starts[keep], run_ends[keep])
+    ]
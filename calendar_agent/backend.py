@@ -1,17 +1,150 @@
+import asyncio
+import json
+from contextlib import aclosing, asynccontextmanager
 from fastapi import FastAPI, Request
-from agent import run_agent
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from agent import arun_agent, astream_agent
+from calendars import get_calendar
+from metrics import (
+    REQUEST_SECONDS,
+    get_trace_sample_rate,
+    render,
+    set_trace_sample_rate,
+    timed,
+    trace
+)
+from prefetch import shutdown as stop_prefetching
+from runtime import run_io, shutdown
+from sessions import get_session_store, new_session_id
+from warmup import WARMUP, warm_up
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build shared resources before reporting ready
+    await run_io(get_session_store)
+    await run_io(get_calendar)
+    if WARMUP:
+        await run_io(warm_up)
+    app.state.ready = True
+    yield
+    # Fail readiness first so load balancers stop routing, then drain the pools
+    app.state.ready = False
+    stop_prefetching()
+    shutdown(wait=True)
+
+app = FastAPI(lifespan=lifespan)
+app.state.ready = False
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: startup finished and the worker accepts traffic"""
+    if not app.state.ready:
+        return JSONResponse({"status": "starting"}, status_code=503)
+    return {"status": "ready"}
 
 @app.post("/chat")
 async def chat(request: Request):
-    """Endpoint for processing chat requests"""
+    """
+    Endpoint for processing chat requests.
+    Body: {"user_input": str, "session_id": optional str,
+           "calendar_ids": optional list of calendars that must all be free}
+    Returns: {"session_id": str, "response": str}
+    """
+    data = await request.json()
+    store = get_session_store()
+    session_id = data.get('session_id') or new_session_id()
+    with trace("chat", session_id=session_id), timed(REQUEST_SECONDS, "chat", route="/chat"):
+        try:
+            state = await run_io(store.get, session_id) or {}
+            response = await arun_agent(data['user_input'], state, data.get('calendar_ids'))
+            await run_io(store.put, session_id, response['state'])
+            return {"session_id": session_id, "response": response['response']}
+        except asyncio.TimeoutError:
+            message = "Agent error: the request timed out. Please try again."
+        except Exception as e:
+            message = f"Agent error: {str(e)}"
+        await run_io(store.delete, session_id)
+        return {"session_id": session_id, "response": message}
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(request: Request):
+    """
+    Same as /chat, answered as Server-Sent Events while the turn runs:
+    "session", "intent" and "progress" events, then a final "response"
+    event with {"session_id": str, "response": str}.
+    A client disconnect cancels the turn and leaves the session unchanged.
+    """
+    data = await request.json()
+    store = get_session_store()
+    session_id = data.get('session_id') or new_session_id()
+
+    async def events():
+        with trace("chat_stream", session_id=session_id), \
+                timed(REQUEST_SECONDS, "chat_stream", route="/chat/stream"):
+            try:
+                yield _sse("session", {"session_id": session_id})
+                state = await run_io(store.get, session_id) or {}
+                turn = astream_agent(data['user_input'], state, data.get('calendar_ids'))
+                async with aclosing(turn):
+                    async for event, payload in turn:
+                        if await request.is_disconnected():
+                            return
+                        if event == "result":
+                            await run_io(store.put, session_id, payload['state'])
+                            yield _sse("response", {"session_id": session_id, "response": payload['response']})
+                        else:
+                            yield _sse(event, payload)
+                return
+            except asyncio.TimeoutError:
+                message = "Agent error: the request timed out. Please try again."
+            except Exception as e:
+                message = f"Agent error: {str(e)}"
+            await run_io(store.delete, session_id)
+            yield _sse("response", {"session_id": session_id, "response": message})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.delete("/sessions/{session_id}")
+async def end_session(session_id: str):
+    """Forget a conversation"""
+    await run_io(get_session_store().delete, session_id)
+    return {"session_id": session_id, "deleted": True}
+
+@app.post("/book/batch")
+async def book_batch(request: Request):
+    """
+    Book many slots at once.
+    Body: {"slots": [{"start": iso, "end": iso, "timezone": str}, ...]}
+    Returns: {"results": [...]} with one entry per slot, in order.
+    """
+    data = await request.json()
+    with timed(REQUEST_SECONDS, "book_batch", route="/book/batch"):
+        results = await run_io(get_calendar().book_appointments, data.get('slots', []))
+    return {"results": results}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/tracing")
+async def get_tracing():
+    return {"sample_rate": get_trace_sample_rate()}
+
+@app.post("/metrics/tracing")
+async def update_tracing(request: Request):
+    """
+    Switch sampled request tracing at runtime.
+    Body: {"sample_rate": float between 0 and 1}
+    """
     data = await request.json()
-    try:
-        response = run_agent(data['user_input'], data.get('state', {}))
-        return response
-    except Exception as e:
-        return {
-            "response": f"Agent error: {str(e)}",
-            "state": {}
-        }
+    set_trace_sample_rate(float(data.get('sample_rate', 0)))
+    return {"sample_rate": get_trace_sample_rate()}
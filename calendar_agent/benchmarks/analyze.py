@@ -0,0 +1,181 @@
+"""
+Bulk intent and slot analysis of logged utterances, over a process pool.
+
+    python benchmarks/analyze.py utterances.jsonl > results.jsonl
+    python benchmarks/analyze.py calls.csv --field message --base 2025-06-23T09:00
+    zcat traffic.jsonl.gz | python benchmarks/analyze.py - --workers 8 -o results.jsonl
+
+Input is JSONL (one string, or an object with the text under --field) or
+CSV with a header row (text in the --field column), from a file or stdin.
+Each utterance gets one output line, in input order:
+
+    {"line": 1, "id": ..., "text": ..., "intent": get_user_intent,
+     "recognized_intent": recognize_intent on a fresh conversation,
+     "start": ..., "end": ..., "duration": minutes, "parse_ms": extract_slots time}
+
+"id" is copied when the input record has one; unparseable times give null
+start/end/duration, and a failing utterance gets an "error" entry instead.
+--base fixes the relative-base date ("tomorrow", "Friday") so runs are
+reproducible. Input is read in chunks of --chunk-size and at most
+--max-in-flight chunks are queued at once, so memory stays flat however
+large the input is.
+"""
+import argparse
+import csv
+import io
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault("CALENDAR_BACKEND", "memory")
+
+def _records(stream, fmt: str, field: str):
+    """Yield (line number, id or None, text) for every utterance in the input."""
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, row.get("id"), row.get(field) or ""
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise SystemExit(f"line {number}: {e}")
+        if isinstance(record, str):
+            yield number, None, record
+        else:
+            yield number, record.get("id"), record.get(field) or ""
+
+def _init_worker() -> None:
+    import utils
+    # "Failed to parse" lines would swamp stderr on production-sized input
+    utils.logger.setLevel(logging.WARNING)
+
+def analyze_chunk(chunk: list, timezone: str, base: str = None) -> list:
+    """Run the intent and slot pipeline over one chunk of (line, id, text) records."""
+    import pytz
+    from agent import _prepare_state, recognize_intent
+    from conversation import message_features
+    from utils import extract_slots, get_user_intent
+
+    relative_base = None
+    if base:
+        relative_base = datetime.fromisoformat(base)
+        if relative_base.tzinfo is None:
+            relative_base = pytz.timezone(timezone).localize(relative_base)
+
+    results = []
+    for number, record_id, text in chunk:
+        result = {"line": number}
+        if record_id is not None:
+            result["id"] = record_id
+        result["text"] = text
+        try:
+            start = time.perf_counter()
+            slots = extract_slots(text, timezone, relative_base)
+            result["parse_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            result["intent"] = get_user_intent(text)
+            # Same base as above, so a dateparser fallback comes from the parse memo
+            state = _prepare_state(text, {})
+            state["turn_features"] = message_features(text, timezone, relative_base)
+            result["recognized_intent"] = recognize_intent(state)["intent"]
+            if slots:
+                start_dt = datetime.fromisoformat(slots["start"])
+                end_dt = datetime.fromisoformat(slots["end"])
+                result.update(start=slots["start"], end=slots["end"],
+                              duration=int((end_dt - start_dt).total_seconds() // 60))
+            else:
+                result.update(start=None, end=None, duration=None)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        results.append(result)
+    return results
+
+def _chunks(records, size: int):
+    while True:
+        chunk = list(itertools.islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+def run(records, out, args) -> tuple:
+    """Analyze every record, writing results in input order; returns (utterances, errors)."""
+    count = errors = 0
+
+    def write(results: list) -> None:
+        nonlocal count, errors
+        for result in results:
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            count += 1
+            errors += "error" in result
+
+    chunks = _chunks(records, args.chunk_size)
+    if args.workers == 0:
+        _init_worker()
+        for chunk in chunks:
+            write(analyze_chunk(chunk, args.timezone, args.base))
+        return count, errors
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(analyze_chunk, chunk, args.timezone, args.base))
+            # Waiting on the oldest chunk keeps the output ordered and the queue bounded
+            if len(pending) >= args.max_in_flight:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+    return count, errors
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL or CSV file of utterances, or - for stdin")
+    parser.add_argument("-o", "--output", help="write results here instead of stdout")
+    parser.add_argument("--format", choices=("jsonl", "csv"),
+                        help="input format (default: from the file extension, else jsonl)")
+    parser.add_argument("--field", default="text", help="JSON key or CSV column holding the utterance")
+    parser.add_argument("--base", help="fixed relative-base datetime, e.g. 2025-06-23T09:00")
+    parser.add_argument("--timezone", default="Asia/Kolkata")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (0 = run in this process)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="utterances per task")
+    parser.add_argument("--max-in-flight", type=int, default=0,
+                        help="chunks queued at once (default: twice the workers)")
+    args = parser.parse_args(argv)
+    if args.base:
+        try:
+            datetime.fromisoformat(args.base)
+        except ValueError:
+            parser.error(f"--base is not an ISO datetime: {args.base}")
+    args.max_in_flight = args.max_in_flight or 2 * max(args.workers, 1)
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+
+    if args.input == "-":
+        source = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    else:
+        source = open(args.input, encoding="utf-8", newline="")
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        count, errors = run(_records(source, fmt, args.field), out, args)
+    finally:
+        if args.input != "-":
+            source.close()
+        if args.output:
+            out.close()
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed else 0.0
+    print(f"{count} utterances in {elapsed:.2f}s ({rate:.0f}/s), {errors} errors", file=sys.stderr)
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Offline microbenchmarks for the parsing, intent and graph hot paths.
+
+    python benchmarks/bench.py                    # run and compare with baseline.json
+    python benchmarks/bench.py --save-baseline    # record a new baseline
+    python benchmarks/bench.py --only extract_slots_warm graph_turn
+
+Runs against the in-memory calendar backend, so no credentials or network
+are needed. Exits with status 1 if any benchmark's mean time per call is
+more than --threshold slower than the stored baseline.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault("CALENDAR_BACKEND", "memory")
+
+import pytz  # noqa: E402
+import utils  # noqa: E402
+from agent import _prepare_state, graph, recognize_intent  # noqa: E402
+import reservations  # noqa: E402
+from calendars import MemoryCalendarBackend, set_calendar  # noqa: E402
+
+CORPUS_PATH = os.path.join(HERE, "corpus.txt")
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+TIMEZONE = "Asia/Kolkata"
+
+def load_corpus(path: str = CORPUS_PATH) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+def _busy_fixture(anchor: datetime) -> list:
+    """A realistic day: a few meetings around the anchor."""
+    day = anchor.replace(hour=0, minute=0, second=0, microsecond=0)
+    return [
+        (day + timedelta(hours=h), day + timedelta(hours=h, minutes=m))
+        for h, m in [(9, 30), (11, 60), (13, 90), (16, 45)]
+    ]
+
+def build_benchmarks(corpus: list) -> dict:
+    """Each benchmark is a callable taking an utterance."""
+    user_tz = pytz.timezone(TIMEZONE)
+    anchor = user_tz.localize(datetime.now().replace(hour=14, minute=0, second=0, microsecond=0) + timedelta(days=1))
+    busy = _busy_fixture(anchor)
+    window_start, window_end = utils.search_window(anchor)
+    slot = {
+        "start": anchor.isoformat(),
+        "end": (anchor + timedelta(minutes=30)).isoformat(),
+        "timezone": TIMEZONE
+    }
+
+    def extract_slots_cold(text):
+        utils._memo.clear()
+        utils.extract_slots(text, TIMEZONE)
+
+    def extract_slots_warm(text):
+        utils.extract_slots(text, TIMEZONE)
+
+    def recognize(text):
+        recognize_intent(_prepare_state(text, {}))
+
+    def get_user_intent(text):
+        utils.get_user_intent(text)
+
+    def business_hours_and_alternative(text):
+        utils.is_business_hours(slot)
+        free = utils.find_free_slots(busy, window_start, window_end, anchor=anchor, timezone=TIMEZONE)
+        utils.suggest_alternative(free)
+
+    def graph_turn(text):
+        set_calendar(MemoryCalendarBackend())
+        # Otherwise the previous call's hold sends every turn down the "someone else is booking" path
+        reservations._store = reservations.MemoryReservations()
+        graph.invoke(_prepare_state(text, {}))
+
+    return {
+        "extract_slots_cold": extract_slots_cold,
+        "extract_slots_warm": extract_slots_warm,
+        "recognize_intent": recognize,
+        "get_user_intent": get_user_intent,
+        "business_hours_and_alternative": business_hours_and_alternative,
+        "graph_turn": graph_turn
+    }
+
+def measure(func, corpus: list, rounds: int) -> dict:
+    """Mean/p50/max time per call in microseconds and peak traced memory per call in KiB."""
+    for text in corpus:
+        func(text)  # warm-up: imports, lazy locale loading, compiled regexes
+
+    timings = []
+    for _ in range(rounds):
+        for text in corpus:
+            start = time.perf_counter()
+            func(text)
+            timings.append(time.perf_counter() - start)
+
+    peaks = []
+    tracemalloc.start()
+    for text in corpus:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        func(text)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    return {
+        "mean_us": statistics.fmean(timings) * 1e6,
+        "p50_us": statistics.median(timings) * 1e6,
+        "max_us": max(timings) * 1e6,
+        "peak_kib": max(peaks) / 1024
+    }
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Return the names of benchmarks slower than baseline by more than `threshold`."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous and result["mean_us"] > previous["mean_us"] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5, help="passes over the corpus per benchmark")
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--only", nargs="*", help="run only these benchmarks")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    benchmarks = build_benchmarks(corpus)
+    if args.only:
+        benchmarks = {name: benchmarks[name] for name in args.only}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    print(f"{'benchmark':32} {'mean µs':>10} {'p50 µs':>10} {'max µs':>10} {'peak KiB':>9} {'vs base':>8}")
+    for name, func in benchmarks.items():
+        result = measure(func, corpus, args.rounds)
+        results[name] = result
+        previous = baseline.get(name)
+        delta = f"{result['mean_us'] / previous['mean_us'] - 1:+.0%}" if previous else "-"
+        print(f"{name:32} {result['mean_us']:10.1f} {result['p50_us']:10.1f} "
+              f"{result['max_us']:10.1f} {result['peak_kib']:9.1f} {delta:>8}")
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"Regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
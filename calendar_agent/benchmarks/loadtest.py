@@ -0,0 +1,272 @@
+"""
+Concurrent load test and conversation replay for the /chat API.
+
+    python benchmarks/loadtest.py --conversations 200 --concurrency 50
+    python benchmarks/loadtest.py --rate 20 --duration 30 --latency-ms 150
+    python benchmarks/loadtest.py --replay conversations.jsonl --concurrency 20
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 --concurrency 100
+
+By default backend.app runs in this process behind an ASGI transport, with
+the in-memory calendar backend standing in for Google (--latency-ms per
+call). With --url the target server's own settings apply; start it with
+CALENDAR_BACKEND=memory for an offline run.
+
+Conversations are scripted (book/confirm, decline and retry, "same time
+tomorrow", cancel, availability follow-up, week listing) or replayed from
+a JSONL file with one {"turns": [...]} object per line, where each turn is
+a string or {"type": ..., "text": ...}. Arrivals are closed-loop (as fast
+as --concurrency allows) or, with --rate, Poisson at that many
+conversations per second, still capped at --concurrency in flight.
+
+Reports throughput plus p50/p95/p99/max latency and error rate per turn
+type. A turn is an error on a non-200 status, a transport failure or
+timeout, or an agent error reply.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import httpx  # noqa: E402
+
+_ERROR_MARKERS = ("Agent error", "I encountered an issue")
+
+def _scripted(rng: random.Random):
+    """Endless stream of scripted conversations over the next two weeks of business hours."""
+    def when(days_from: int = 1):
+        day = datetime.now() + timedelta(days=rng.randint(days_from, 14))
+        hour, half = rng.randint(9, 17), rng.choice((0, 30))
+        return day.strftime("%d %B"), f"{hour % 12 or 12}:{half:02d} {'PM' if hour >= 12 else 'AM'}"
+
+    def book_confirm():
+        day, at = when()
+        return [("book", f"Book a meeting on {day} at {at}"), ("confirm", "yes")]
+
+    def decline_retry():
+        day, at = when()
+        _, later = when()
+        return [("book", f"Schedule a call {day} at {at}"), ("decline", "no"),
+                ("time", f"{day} at {later}"), ("confirm", "yes")]
+
+    def same_time_tomorrow():
+        _, at = when()
+        return [("book", f"Book tomorrow at {at}"), ("confirm", "yes"),
+                ("same_time", "same time tomorrow"), ("confirm", "yes")]
+
+    def cancel():
+        day, at = when()
+        return [("book", f"Book {day} at {at}"), ("cancel", "cancel")]
+
+    def availability():
+        _, at = when()
+        return [("availability", "Am I free tomorrow?"), ("time", at), ("confirm", "yes")]
+
+    def listing():
+        return [("list", "What's free next week?"), ("list", "What's free tomorrow for 2 hours?")]
+
+    scenarios = [book_confirm, book_confirm, decline_retry, same_time_tomorrow, cancel, availability, listing]
+    while True:
+        yield rng.choice(scenarios)()
+
+def _replayed(path: str):
+    conversations = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            turns = []
+            for turn in json.loads(line)["turns"]:
+                if isinstance(turn, str):
+                    turns.append(("turn", turn))
+                else:
+                    turns.append((turn.get("type", "turn"), turn["text"]))
+            conversations.append(turns)
+    if not conversations:
+        raise SystemExit(f"No conversations in {path}")
+    return itertools.cycle(conversations)
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.first_event = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.samples = []
+
+    def record(self, kind: str, seconds: float, ok: bool, first_event: float = None, detail: str = "") -> None:
+        self.latencies[kind].append(seconds)
+        if first_event is not None:
+            self.first_event[kind].append(first_event)
+        if not ok:
+            self.errors[kind] += 1
+            if len(self.samples) < 5:
+                self.samples.append(f"{kind}: {detail[:160]}")
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+async def _turn(client: httpx.AsyncClient, text: str, session_id, stream: bool):
+    """Send one message; returns (ok, session_id, seconds to first event or None, detail)."""
+    body = {"user_input": text, "session_id": session_id}
+    if not stream:
+        resp = await client.post("/chat", json=body)
+        if resp.status_code != 200:
+            return False, session_id, None, f"HTTP {resp.status_code}"
+        data = resp.json()
+        reply = data.get("response", "")
+        return not any(m in reply for m in _ERROR_MARKERS), data.get("session_id", session_id), None, reply
+
+    start = time.perf_counter()
+    first, event, reply = None, None, ""
+    async with client.stream("POST", "/chat/stream", json=body) as resp:
+        if resp.status_code != 200:
+            return False, session_id, None, f"HTTP {resp.status_code}"
+        async for line in resp.aiter_lines():
+            if first is None and line:
+                first = time.perf_counter() - start
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                session_id = data.get("session_id", session_id)
+                if event == "response":
+                    reply = data.get("response", "")
+    ok = bool(reply) and not any(m in reply for m in _ERROR_MARKERS)
+    return ok, session_id, first, reply or "stream ended without a response"
+
+async def run_conversation(client: httpx.AsyncClient, turns: list, stats: Stats, think: float, stream: bool) -> None:
+    session_id = None
+    for kind, text in turns:
+        start = time.perf_counter()
+        try:
+            ok, session_id, first, detail = await _turn(client, text, session_id, stream)
+        except Exception as e:
+            ok, first, detail = False, None, f"{type(e).__name__}: {e}"
+        stats.record(kind, time.perf_counter() - start, ok, first, detail)
+        if think:
+            await asyncio.sleep(think)
+    if session_id:
+        try:
+            await client.delete(f"/sessions/{session_id}")
+        except Exception:
+            pass
+
+async def drive(client: httpx.AsyncClient, conversations, args, stats: Stats) -> tuple:
+    """Launch conversations until the count or duration runs out; returns (seconds, conversations)."""
+    rng = random.Random(args.seed)
+    slots = asyncio.Semaphore(args.concurrency)
+    running = set()
+    start = time.perf_counter()
+    launched = 0
+    while launched < args.conversations:
+        if args.duration and time.perf_counter() - start >= args.duration:
+            break
+        await slots.acquire()
+        task = asyncio.create_task(run_conversation(
+            client, next(conversations), stats, args.think_ms / 1000, args.stream))
+        running.add(task)
+        task.add_done_callback(running.discard)
+        task.add_done_callback(lambda _: slots.release())
+        launched += 1
+        if args.rate:
+            await asyncio.sleep(rng.expovariate(args.rate))
+    await asyncio.gather(*running)
+    return time.perf_counter() - start, launched
+
+def report(stats: Stats, elapsed: float, conversations: int) -> dict:
+    rows = dict(stats.latencies)
+    rows["all"] = [v for values in stats.latencies.values() for v in values]
+    errors = dict(stats.errors)
+    errors["all"] = sum(stats.errors.values())
+    first_events = [v for values in stats.first_event.values() for v in values]
+
+    summary = {"elapsed_s": round(elapsed, 3), "conversations": conversations, "turns": len(rows["all"]),
+               "turns_per_s": round(len(rows["all"]) / elapsed, 2) if elapsed else 0.0, "by_type": {}}
+    print(f"{'turn type':14} {'count':>7} {'errors':>7} {'err %':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for kind in sorted(rows, key=lambda k: (k == "all", k)):
+        values = rows[kind]
+        if not values:
+            continue
+        row = {
+            "count": len(values),
+            "errors": errors.get(kind, 0),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(max(values) * 1000, 2)
+        }
+        summary["by_type"][kind] = row
+        print(f"{kind:14} {row['count']:7d} {row['errors']:7d} {row['errors'] / row['count']:6.1%} "
+              f"{row['p50_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f} {row['max_ms']:8.1f}")
+    if first_events:
+        summary["first_event_p50_ms"] = round(percentile(first_events, 50) * 1000, 2)
+        summary["first_event_p95_ms"] = round(percentile(first_events, 95) * 1000, 2)
+        print(f"first event: p50 {summary['first_event_p50_ms']} ms, p95 {summary['first_event_p95_ms']} ms")
+    print(f"{summary['turns']} turns in {conversations} conversations over {elapsed:.2f}s: "
+          f"{summary['turns_per_s']} turns/s, {conversations / elapsed:.2f} conversations/s")
+    for sample in stats.samples:
+        print(f"  error sample - {sample}")
+    return summary
+
+async def main_async(args) -> dict:
+    stats = Stats()
+    conversations = _replayed(args.replay) if args.replay else _scripted(random.Random(args.seed))
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+            elapsed, launched = await drive(client, conversations, args, stats)
+    else:
+        from backend import app
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest",
+                                         limits=limits, timeout=timeout) as client:
+                elapsed, launched = await drive(client, conversations, args, stats)
+    return report(stats, elapsed, launched)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="load a running server instead of an in-process app")
+    parser.add_argument("--conversations", type=int, default=100, help="conversations to run (default 100)")
+    parser.add_argument("--duration", type=float, default=0, help="stop launching after this many seconds")
+    parser.add_argument("--concurrency", type=int, default=20, help="conversations in flight at most")
+    parser.add_argument("--rate", type=float, default=0, help="Poisson arrivals per second (0 = closed loop)")
+    parser.add_argument("--think-ms", type=float, default=0, help="pause between turns of a conversation")
+    parser.add_argument("--latency-ms", type=float, default=50, help="in-process calendar latency per call")
+    parser.add_argument("--replay", help="JSONL file of recorded conversations")
+    parser.add_argument("--stream", action="store_true",
+                        help="use /chat/stream and report time to first event (meaningful with --url)")
+    parser.add_argument("--timeout", type=float, default=60, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args(argv)
+    if args.duration and args.conversations == parser.get_default("conversations"):
+        args.conversations = sys.maxsize
+
+    if not args.url:
+        # Must be set before the backend modules are imported
+        os.environ["CALENDAR_BACKEND"] = "memory"
+        os.environ["CALENDAR_LATENCY_MS"] = str(args.latency_ms)
+
+    summary = asyncio.run(main_async(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+            f.write("\n")
+    return 1 if summary["by_type"].get("all", {}).get("errors") else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
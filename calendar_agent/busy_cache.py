@@ -0,0 +1,133 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+import pytz
+
+BUSY_CACHE = os.getenv("BUSY_CACHE", "memory")
+BUSY_CACHE_PATH = os.getenv("BUSY_CACHE_PATH", "busy_cache.db")
+BUSY_CACHE_TTL = float(os.getenv("BUSY_CACHE_TTL", "60"))
+
+def _to_pairs(busy: list) -> list:
+    return [(start.timestamp(), end.timestamp()) for start, end in busy]
+
+def _from_pairs(pairs: list) -> list:
+    return [
+        (datetime.fromtimestamp(s, pytz.UTC), datetime.fromtimestamp(e, pytz.UTC))
+        for s, e in pairs
+    ]
+
+def _clip(pairs: list, start: float, end: float) -> list:
+    return [(s, e) for s, e in pairs if s < end and e > start]
+
+class MemoryBusyCache:
+    """
+    Per-process cache of FreeBusy results: for each calendar, a few recently
+    fetched windows and the busy intervals inside them.
+    """
+
+    MAX_WINDOWS = 32
+
+    def __init__(self, ttl: float = BUSY_CACHE_TTL):
+        self.ttl = ttl
+        self._windows = {}  # calendar_id -> [(start, end, fetched_at, pairs)]
+        self._lock = threading.Lock()
+
+    def get(self, calendar_id: str, start_dt: datetime, end_dt: datetime, max_age: float = None):
+        """Busy intervals if a cached window younger than `max_age` covers the range, else None."""
+        start, end = start_dt.timestamp(), end_dt.timestamp()
+        oldest = time.time() - (self.ttl if max_age is None else max_age)
+        with self._lock:
+            for w_start, w_end, fetched_at, pairs in reversed(self._windows.get(calendar_id, [])):
+                if w_start <= start and w_end >= end and fetched_at >= oldest:
+                    return _from_pairs(_clip(pairs, start, end))
+        return None
+
+    def put(self, calendar_id: str, start_dt: datetime, end_dt: datetime, busy: list) -> None:
+        entry = (start_dt.timestamp(), end_dt.timestamp(), time.time(), _to_pairs(busy))
+        with self._lock:
+            windows = self._windows.setdefault(calendar_id, [])
+            windows.append(entry)
+            del windows[:-self.MAX_WINDOWS]
+
+    def invalidate(self, calendar_id: str, start_dt: datetime, end_dt: datetime) -> None:
+        """Drop cached windows that overlap a range that just changed."""
+        start, end = start_dt.timestamp(), end_dt.timestamp()
+        with self._lock:
+            windows = self._windows.get(calendar_id, [])
+            windows[:] = [w for w in windows if w[0] >= end or w[1] <= start]
+
+class SQLiteBusyCache:
+    """FreeBusy cache in SQLite, shared by every worker on the machine."""
+
+    _PURGE_EVERY = 500
+
+    def __init__(self, path: str = BUSY_CACHE_PATH, ttl: float = BUSY_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._puts = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS busy_windows ("
+                "calendar_id TEXT NOT NULL, window_start REAL NOT NULL, window_end REAL NOT NULL, "
+                "fetched_at REAL NOT NULL, busy TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS busy_windows_lookup "
+                "ON busy_windows (calendar_id, window_start, window_end)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, calendar_id: str, start_dt: datetime, end_dt: datetime, max_age: float = None):
+        start, end = start_dt.timestamp(), end_dt.timestamp()
+        oldest = time.time() - (self.ttl if max_age is None else max_age)
+        row = self._connection().execute(
+            "SELECT busy FROM busy_windows WHERE calendar_id = ? AND window_start <= ? "
+            "AND window_end >= ? AND fetched_at >= ? ORDER BY fetched_at DESC LIMIT 1",
+            (calendar_id, start, end, oldest)
+        ).fetchone()
+        if row is None:
+            return None
+        return _from_pairs(_clip(json.loads(row[0]), start, end))
+
+    def put(self, calendar_id: str, start_dt: datetime, end_dt: datetime, busy: list) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO busy_windows (calendar_id, window_start, window_end, fetched_at, busy) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (calendar_id, start_dt.timestamp(), end_dt.timestamp(), time.time(),
+                 json.dumps(_to_pairs(busy)))
+            )
+            self._puts += 1
+            if self._puts % self._PURGE_EVERY == 0:
+                conn.execute("DELETE FROM busy_windows WHERE fetched_at < ?", (time.time() - self.ttl,))
+
+    def invalidate(self, calendar_id: str, start_dt: datetime, end_dt: datetime) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "DELETE FROM busy_windows WHERE calendar_id = ? AND window_start < ? AND window_end > ?",
+                (calendar_id, end_dt.timestamp(), start_dt.timestamp())
+            )
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_busy_cache():
+    """Return the configured process-wide busy cache (BUSY_CACHE=memory|sqlite)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SQLiteBusyCache() if BUSY_CACHE == "sqlite" else MemoryBusyCache()
+    return _cache
@@ -0,0 +1,259 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+import pytz
+from mirror import IntervalIndex
+from reservations import claim_ranges, release_slots
+from utils import find_free_slots, merge_intervals, search_window, slot_range
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Which implementation get_calendar() returns: "google" or "memory"
+CALENDAR_BACKEND = os.getenv("CALENDAR_BACKEND", "google")
+# Artificial per-call latency for the memory backend, in milliseconds
+CALENDAR_LATENCY_MS = float(os.getenv("CALENDAR_LATENCY_MS", "0"))
+
+class CalendarBackend(ABC):
+    """Operations the agent needs from a calendar."""
+
+    @abstractmethod
+    def check_availability(self, slots: dict, calendar_ids: list = None, fresh: bool = False) -> bool:
+        """
+        True if nothing is booked during the slot on any of the calendars.
+        `fresh` asks the source of truth, skipping any local cache.
+        """
+
+    @abstractmethod
+    def get_busy_intervals(self, start_dt: datetime, end_dt: datetime, calendar_ids: list = None,
+                           fresh: bool = False) -> list:
+        """Merged busy (start, end) datetimes overlapping the window across the calendars."""
+
+    @abstractmethod
+    def book_appointment(self, slots: dict) -> bool:
+        """Insert one event; True on success."""
+
+    @abstractmethod
+    def book_appointments(self, slots_list: list) -> list:
+        """Insert many events; one result dict per slot (see gcal.book_appointments)."""
+
+    @abstractmethod
+    def book_series(self, series: dict) -> bool:
+        """Insert one recurring event (see recurrence.build_series); True on success."""
+
+    def find_series_conflicts(self, occurrences: list, calendar_ids: list = None, fresh: bool = False) -> list:
+        """
+        Indexes of the occurrences that overlap busy time on any calendar,
+        from one busy query spanning the whole series.
+        """
+        ranges = [slot_range(slots) for slots in occurrences]
+        if not ranges:
+            return []
+        busy = IntervalIndex()
+        spans = self.get_busy_intervals(ranges[0][0], ranges[-1][1], calendar_ids, fresh=fresh)
+        for n, (start, end) in enumerate(spans):
+            busy.add(f"busy-{n}", start.timestamp(), end.timestamp())
+        return [
+            i for i, (start, end) in enumerate(ranges)
+            if busy.overlaps(start.timestamp(), end.timestamp())
+        ]
+
+    def prefetch(self, start_dt: datetime, end_dt: datetime, calendar_ids: list = None) -> None:
+        """Load busy intervals for the window into the backend's cache, if it has one."""
+        self.get_busy_intervals(start_dt, end_dt, calendar_ids)
+
+    def warm_up(self) -> None:
+        """Set up clients and credentials ahead of the first request, if the backend has any."""
+
+    def list_free_blocks(self, start_dt: datetime, end_dt: datetime, duration: int = 30,
+                         calendar_ids: list = None, timezone: str = "Asia/Kolkata") -> list:
+        """
+        Free blocks of at least `duration` minutes in business hours across
+        the calendars, from a single busy query over the whole range.
+        """
+        from availability import free_blocks
+        busy = self.get_busy_intervals(start_dt, end_dt, calendar_ids)
+        return free_blocks(busy, start_dt, end_dt, duration, timezone)
+
+    def find_alternatives(self, slots: dict, count: int = 2, calendar_ids: list = None) -> list:
+        """
+        Return up to `count` slots nearest to the requested one that are free
+        on every calendar. Busy data for the whole search window is fetched once.
+        """
+        try:
+            start_dt, end_dt = slot_range(slots)
+            duration = int((end_dt - start_dt).total_seconds() // 60)
+            window_start, window_end = search_window(start_dt)
+            busy = self.get_busy_intervals(window_start, window_end, calendar_ids)
+            return find_free_slots(
+                busy, window_start, window_end,
+                duration=duration,
+                count=count,
+                anchor=start_dt,
+                timezone=slots.get("timezone", "Asia/Kolkata")
+            )
+        except Exception as e:
+            logger.error("Alternative search failed: %s", e)
+        return []
+
+class GoogleCalendarBackend(CalendarBackend):
+    """Google Calendar through gcal; imported lazily so other backends need no Google libraries."""
+
+    def __init__(self):
+        import gcal
+        self._gcal = gcal
+
+    def check_availability(self, slots: dict, calendar_ids: list = None, fresh: bool = False) -> bool:
+        return self._gcal.check_availability(slots, calendar_ids, fresh)
+
+    def get_busy_intervals(self, start_dt: datetime, end_dt: datetime, calendar_ids: list = None,
+                           fresh: bool = False) -> list:
+        return self._gcal.get_busy_intervals(start_dt, end_dt, calendar_ids, fresh)
+
+    def book_appointment(self, slots: dict) -> bool:
+        return self._gcal.book_appointment(slots)
+
+    def book_appointments(self, slots_list: list) -> list:
+        return self._gcal.book_appointments(slots_list)
+
+    def book_series(self, series: dict) -> bool:
+        return self._gcal.book_series(series)
+
+    def warm_up(self) -> None:
+        self._gcal.warm_up()
+
+class MemoryCalendarBackend(CalendarBackend):
+    """
+    In-process calendars backed by one IntervalIndex each, for offline runs
+    and benchmarks. Bookings go to `calendar_id`. `latency` seconds are slept
+    on every call to stand in for network round trips.
+    """
+
+    def __init__(self, latency: float = 0.0, calendar_id: str = "primary"):
+        self.latency = latency
+        self.calendar_id = calendar_id
+        self._indexes = {calendar_id: IntervalIndex()}
+        self._lock = threading.Lock()
+
+    @property
+    def _index(self) -> IntervalIndex:
+        return self._indexes[self.calendar_id]
+
+    def add_busy(self, calendar_id: str, start_dt: datetime, end_dt: datetime) -> None:
+        """Seed a busy interval on any calendar."""
+        with self._lock:
+            index = self._indexes.setdefault(calendar_id, IntervalIndex())
+            index.add(uuid.uuid4().hex, start_dt.timestamp(), end_dt.timestamp())
+
+    def _busy(self, start: float, end: float, calendar_ids: list) -> list:
+        spans = []
+        for calendar_id in calendar_ids or [self.calendar_id]:
+            index = self._indexes.get(calendar_id)
+            if index is not None:
+                spans.extend(index.overlapping(start, end))
+        return merge_intervals(spans)
+
+    def prefetch(self, start_dt: datetime, end_dt: datetime, calendar_ids: list = None) -> None:
+        # Everything is already local
+        pass
+
+    def _round_trip(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+    def check_availability(self, slots: dict, calendar_ids: list = None, fresh: bool = False) -> bool:
+        self._round_trip()
+        try:
+            start_dt, end_dt = slot_range(slots)
+        except Exception:
+            logger.error("Invalid slots format")
+            return False
+        with self._lock:
+            return not self._busy(start_dt.timestamp(), end_dt.timestamp(), calendar_ids)
+
+    def get_busy_intervals(self, start_dt: datetime, end_dt: datetime, calendar_ids: list = None,
+                           fresh: bool = False) -> list:
+        self._round_trip()
+        with self._lock:
+            spans = self._busy(start_dt.timestamp(), end_dt.timestamp(), calendar_ids)
+        return [
+            (datetime.fromtimestamp(s, pytz.UTC), datetime.fromtimestamp(e, pytz.UTC))
+            for s, e in spans
+        ]
+
+    def _insert(self, start_dt: datetime, end_dt: datetime) -> str:
+        event_id = uuid.uuid4().hex
+        self._index.add(event_id, start_dt.timestamp(), end_dt.timestamp())
+        return event_id
+
+    def book_appointment(self, slots: dict) -> bool:
+        self._round_trip()
+        try:
+            start_dt, end_dt = slot_range(slots)
+        except Exception:
+            logger.error("Invalid slots for booking")
+            return False
+        with self._lock:
+            self._insert(start_dt, end_dt)
+        return True
+
+    def book_appointments(self, slots_list: list) -> list:
+        # One round trip for the availability query, one for the batch insert
+        self._round_trip()
+        self._round_trip()
+        results = [{"slots": slots, "status": "invalid"} for slots in slots_list]
+        ranges = {}
+        for i, slots in enumerate(slots_list):
+            try:
+                ranges[i] = slot_range(slots)
+            except Exception:
+                pass
+        # Slots a chat session holds are not free, as in gcal.book_appointments
+        claims = claim_ranges(ranges)
+        try:
+            with self._lock:
+                for i, (start_dt, end_dt) in ranges.items():
+                    if i not in claims or self._index.overlaps(start_dt.timestamp(), end_dt.timestamp()):
+                        results[i]["status"] = "busy"
+                        continue
+                    event_id = self._insert(start_dt, end_dt)
+                    results[i].update(status="booked", event_id=event_id)
+        finally:
+            release_slots(claims.values())
+        return results
+
+    def book_series(self, series: dict) -> bool:
+        self._round_trip()
+        with self._lock:
+            for slots in series["occurrences"]:
+                self._insert(*slot_range(slots))
+        return True
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+def _create_calendar() -> CalendarBackend:
+    if CALENDAR_BACKEND == "memory":
+        return MemoryCalendarBackend(latency=CALENDAR_LATENCY_MS / 1000)
+    if CALENDAR_BACKEND == "google":
+        return GoogleCalendarBackend()
+    raise ValueError(f"Unknown CALENDAR_BACKEND: {CALENDAR_BACKEND}")
+
+def get_calendar() -> CalendarBackend:
+    """Return the calendar backend chosen by CALENDAR_BACKEND at startup."""
+    global _calendar
+    if _calendar is None:
+        with _calendar_lock:
+            if _calendar is None:
+                _calendar = _create_calendar()
+    return _calendar
+
+def set_calendar(calendar: CalendarBackend) -> None:
+    """Replace the process-wide backend (benchmarks, load tests)."""
+    global _calendar
+    with _calendar_lock:
+        _calendar = calendar
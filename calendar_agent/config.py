@@ -0,0 +1,71 @@
+import json
+import logging
+import os
+import threading
+import tomllib
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Service-account key as JSON text, or a path to the key file
+CREDENTIALS_JSON = os.getenv("GOOGLE_CREDENTIALS_JSON")
+CREDENTIALS_FILE = os.getenv("GOOGLE_CREDENTIALS_FILE") or os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+CALENDAR_ID = os.getenv("CALENDAR_ID")
+# Streamlit-style secrets file with a [google_credentials] table and CALENDAR_ID;
+# without it the same places Streamlit looks are tried
+SECRETS_FILE = os.getenv("AGENT_SECRETS_FILE")
+_SECRETS_PATHS = (
+    os.path.join(os.getcwd(), ".streamlit", "secrets.toml"),
+    os.path.join(HERE, ".streamlit", "secrets.toml"),
+    os.path.expanduser(os.path.join("~", ".streamlit", "secrets.toml"))
+)
+
+_secrets = None
+_lock = threading.Lock()
+
+def set_secrets(secrets: dict) -> None:
+    """Use an already loaded secrets mapping (e.g. st.secrets in the UI) instead of the file."""
+    global _secrets
+    with _lock:
+        _secrets = dict(secrets)
+
+def load_secrets() -> dict:
+    """The secrets file's contents, read once; empty when there is none."""
+    global _secrets
+    if _secrets is None:
+        with _lock:
+            if _secrets is None:
+                paths = [SECRETS_FILE] if SECRETS_FILE else _SECRETS_PATHS
+                path = next((p for p in paths if os.path.isfile(p)), None)
+                if path is None:
+                    _secrets = {}
+                else:
+                    with open(path, "rb") as f:
+                        _secrets = tomllib.load(f)
+                    logger.info("Loaded secrets from %s", path)
+    return _secrets
+
+def google_credentials() -> dict:
+    """
+    Service-account info for the Calendar API, from GOOGLE_CREDENTIALS_JSON,
+    then the key file in GOOGLE_CREDENTIALS_FILE or
+    GOOGLE_APPLICATION_CREDENTIALS, then the secrets file.
+    """
+    if CREDENTIALS_JSON:
+        return json.loads(CREDENTIALS_JSON)
+    if CREDENTIALS_FILE:
+        with open(CREDENTIALS_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    credentials = load_secrets().get("google_credentials")
+    if not credentials:
+        raise RuntimeError(
+            "No Google credentials: set GOOGLE_CREDENTIALS_JSON or GOOGLE_CREDENTIALS_FILE, "
+            "or add [google_credentials] to .streamlit/secrets.toml"
+        )
+    return dict(credentials)
+
+def calendar_id() -> str:
+    """Calendar to book into: CALENDAR_ID, then the secrets file, then 'primary'."""
+    return CALENDAR_ID or load_secrets().get("CALENDAR_ID", "primary")
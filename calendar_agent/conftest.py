@@ -0,0 +1,19 @@
+import os
+
+# Tests never call Google; must be set before the agent modules are imported
+os.environ.setdefault("CALENDAR_BACKEND", "memory")
+
+import pytest  # noqa: E402
+import calendars  # noqa: E402
+import reservations  # noqa: E402
+
+# test_gcal.py is a manual script against a real calendar, not a test module
+collect_ignore = ["test_gcal.py"]
+
+@pytest.fixture
+def calendar(monkeypatch):
+    """A fresh in-memory calendar and reservation store for one test."""
+    calendar = calendars.MemoryCalendarBackend()
+    monkeypatch.setattr(calendars, "_calendar", calendar)
+    monkeypatch.setattr(reservations, "_store", reservations.MemoryReservations())
+    return calendar
@@ -0,0 +1,64 @@
+from datetime import datetime
+from intent import classify
+from recurrence import parse_recurrence
+from timeparse import mentions_date, mentions_time
+from utils import extract_entities
+
+# Messages kept verbatim; older turns only survive through the sticky flags
+HISTORY_WINDOW = 20
+
+# Features that, once seen anywhere in the conversation, stay set
+STICKY_FLAGS = ("book", "availability", "day", "same_time")
+
+def message_features(text: str, timezone: str = "Asia/Kolkata", relative_base: datetime = None) -> dict:
+    """
+    Extract everything the agent nodes need from one message, once. This is
+    the only place a message is parsed for dates and times; later turns
+    reuse the stored entities instead of re-parsing old text.
+    `relative_base` fixes "tomorrow" and friends (default: now).
+    """
+    lower = text.lower()
+    features = classify(text)
+    features["mentions_date"] = mentions_date(lower)
+    features["mentions_time"] = mentions_time(lower)
+    # In "every Tuesday at 3 PM" the slot comes from what the repeat phrases leave
+    features["recurrence"] = parse_recurrence(lower)
+    rest = features["recurrence"]["rest"] if features["recurrence"] else text
+    # Listing questions only need the grammar's day or week, never dateparser
+    listing = features["intent"] == "list_availability" and not features["mentions_time"]
+    features["entities"] = extract_entities(rest, timezone, relative_base, fallback=not listing)
+    return features
+
+def seen(state: dict, features: dict, flag: str) -> bool:
+    """True if `flag` is set on this turn or on any earlier turn."""
+    return features[flag] or state.get("intent_flags", {}).get(flag, False)
+
+def remember_message(state: dict, text: str, features: dict = None) -> dict:
+    """
+    Append a message to the rolling window and fold its features into the
+    conversation-level flags. Cost is constant regardless of history length.
+    """
+    if features is None:
+        features = message_features(text)
+
+    history = state.setdefault("conversation_history", [])
+    history.append(text)
+    del history[:-HISTORY_WINDOW]
+
+    flags = state.setdefault("intent_flags", {})
+    for flag in STICKY_FLAGS:
+        if features[flag]:
+            flags[flag] = True
+
+    if features["entities"]["date"]:
+        dates = state.setdefault("date_entities", [])
+        dates.append(features["entities"]["date"])
+        del dates[:-2]
+    return features
+
+def prior_date(state: dict, features: dict):
+    """Date entity of the most recent earlier message that named a day, ignoring the current turn."""
+    dates = state.get("date_entities") or []
+    if features["entities"]["date"]:
+        dates = dates[:-1]
+    return dates[-1] if dates else None
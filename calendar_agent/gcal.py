@@ -1,40 +1,210 @@
-import streamlit as st
 import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+import httplib2
+import google_auth_httplib2
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
 import pytz
-from datetime import datetime
+import config
+from busy_cache import get_busy_cache
+from mirror import IntervalIndex, get_mirror
+from reservations import claim_ranges, release_slots
+from resilience import CalendarUnavailable, STALE_MAX_AGE, coalesce, guarded_call, mark_stale
+from utils import merge_intervals, slot_range
 
 # Configure logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+SCOPES = ['https://www.googleapis.com/auth/calendar']
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+HTTP_TIMEOUT = 30
+# Calendar API limit on calls per batch request
+BATCH_LIMIT = 50
+
+class CalendarClient:
+    """
+    Process-wide Google Calendar client.
+
+    The service object is built once from the discovery document bundled with
+    google-api-python-client. httplib2 connections are not thread-safe, so each
+    thread gets its own keep-alive transport, while all threads share one set of
+    credentials that is refreshed shortly before the token expires.
+    """
+
+    def __init__(self, credentials_info: dict, calendar_id: str = "primary"):
+        self.calendar_id = calendar_id
+        self._credentials = service_account.Credentials.from_service_account_info(
+            credentials_info,
+            scopes=SCOPES
+        )
+        self._refresh_lock = threading.Lock()
+        self._local = threading.local()
+        self.service = build(
+            'calendar', 'v3',
+            http=self._authorized_http(),
+            requestBuilder=self._build_request,
+            static_discovery=True
+        )
+
+    def _authorized_http(self):
+        """Return this thread's authorized keep-alive transport."""
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(
+                self._credentials,
+                http=httplib2.Http(timeout=HTTP_TIMEOUT)
+            )
+            self._local.http = http
+        return http
+
+    def _build_request(self, http, *args, **kwargs):
+        self._ensure_token()
+        return HttpRequest(self._authorized_http(), *args, **kwargs)
+
+    def _token_expiring(self) -> bool:
+        creds = self._credentials
+        if not creds.token or creds.expiry is None:
+            return True
+        # google-auth stores expiry as a naive UTC datetime
+        return creds.expiry - datetime.utcnow() < TOKEN_REFRESH_MARGIN
+
+    def _ensure_token(self) -> None:
+        if not self._token_expiring():
+            return
+        with self._refresh_lock:
+            if self._token_expiring():
+                request = google_auth_httplib2.Request(httplib2.Http(timeout=HTTP_TIMEOUT))
+                self._credentials.refresh(request)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client() -> CalendarClient:
+    """Return the shared CalendarClient, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                try:
+                    _client = CalendarClient(config.google_credentials(), config.calendar_id())
+                except Exception as e:
+                    logger.error("Credential loading failed: %s", e)
+                    raise
+    return _client
+
+def warm_up() -> None:
+    """Build the client and fetch an access token before the first request needs them."""
+    get_client()._ensure_token()
+
 def get_service_and_calendar_id():
     """
-    Authenticate using credentials from Streamlit secrets.
+    Return the shared Calendar service and configured calendar ID.
     Returns:
         service: Google Calendar API service object
         calendar_id: The calendar ID to use for API calls
     """
-    try:
-        # Get credentials from secrets.toml
-        credentials_info = dict(st.secrets["google_credentials"])
-        calendar_id = st.secrets.get("CALENDAR_ID", "primary")
-        
-        creds = service_account.Credentials.from_service_account_info(
-            credentials_info,
-            scopes=['https://www.googleapis.com/auth/calendar']
-        )
-        service = build('calendar', 'v3', credentials=creds)
-        return service, calendar_id
-    except Exception as e:
-        logger.error(f"Credential loading failed: {str(e)}")
-        raise
+    client = get_client()
+    return client.service, client.calendar_id
+
+def _synced_mirror(service, calendar_id: str):
+    """Return the calendar mirror if it is (or can be made) fresh, else None."""
+    mirror = get_mirror(calendar_id)
+    if mirror.unsyncable:
+        return None
+    if not mirror.is_fresh():
+        try:
+            mirror.sync(service)
+        except Exception as e:
+            logger.warning("Calendar mirror sync failed: %s", e)
+    return mirror if mirror.is_fresh() else None
+
+def _query_busy(service, calendar_ids: list, start_dt: datetime, end_dt: datetime) -> dict:
+    """Fetch busy intervals for every calendar in one FreeBusy request, keyed by calendar ID."""
+    body = {
+        "timeMin": start_dt.astimezone(pytz.UTC).isoformat(),
+        "timeMax": end_dt.astimezone(pytz.UTC).isoformat(),
+        "items": [{"id": calendar_id} for calendar_id in calendar_ids]
+    }
+    response = guarded_call("freebusy", service.freebusy().query(body=body).execute)
+    
+    busy = {}
+    for calendar_id in calendar_ids:
+        calendar = response['calendars'].get(calendar_id, {})
+        if calendar.get('errors'):
+            # An unreadable calendar must not look free
+            raise ValueError(f"FreeBusy failed for {calendar_id}: {calendar['errors']}")
+        busy[calendar_id] = [
+            (datetime.fromisoformat(b['start']), datetime.fromisoformat(b['end']))
+            for b in calendar.get('busy', [])
+        ]
+    return busy
+
+def _fetch_busy(service, calendar_ids: list, start_dt: datetime, end_dt: datetime) -> dict:
+    busy = _query_busy(service, calendar_ids, start_dt, end_dt)
+    cache = get_busy_cache()
+    for calendar_id, calendar_busy in busy.items():
+        cache.put(calendar_id, start_dt, end_dt, calendar_busy)
+    return busy
+
+def _stale_busy(calendar_ids: list, start_dt: datetime, end_dt: datetime) -> dict:
+    """Older cached busy data for every calendar, or CalendarUnavailable if any is missing."""
+    cache = get_busy_cache()
+    busy = {}
+    for calendar_id in calendar_ids:
+        busy[calendar_id] = cache.get(calendar_id, start_dt, end_dt, max_age=STALE_MAX_AGE)
+        if busy[calendar_id] is None:
+            raise CalendarUnavailable(f"No recent busy data for {calendar_id}")
+    mark_stale("freebusy")
+    return busy
+
+def get_busy_intervals(start_dt: datetime, end_dt: datetime, calendar_ids: list = None,
+                       fresh: bool = False) -> list:
+    """
+    Return merged busy (start, end) datetimes across calendars for the window.
+    Fresh mirrors and the shared busy cache answer locally; all remaining
+    calendars share one FreeBusy query whose results are cached, and
+    concurrent identical queries share one request. While Google is
+    degraded, cached data up to STALE_MAX_AGE old is served and flagged
+    through resilience.stale_reads().
 
-def check_availability(slots: dict) -> bool:
-    """Check availability using Google Calendar FreeBusy API"""
-    logger.info(f"Checking availability: {slots}")
+    `fresh` skips the mirrors, the cache, coalescing and stale fallback and
+    always queries FreeBusy, for re-checks right before an insert.
+    """
+    service, default_calendar_id = get_service_and_calendar_id()
+    calendar_ids = list(dict.fromkeys(calendar_ids)) if calendar_ids else [default_calendar_id]
+    if fresh:
+        fetched = _fetch_busy(service, calendar_ids, start_dt, end_dt)
+        return merge_intervals([interval for busy in fetched.values() for interval in busy])
+    cache = get_busy_cache()
+    
+    busy, remote = [], []
+    for calendar_id in calendar_ids:
+        mirror = _synced_mirror(service, calendar_id)
+        cached = None if mirror else cache.get(calendar_id, start_dt, end_dt)
+        if mirror:
+            busy.extend(mirror.busy_between(start_dt, end_dt))
+        elif cached is not None:
+            busy.extend(cached)
+        else:
+            remote.append(calendar_id)
+    if remote:
+        key = (tuple(remote), start_dt.timestamp(), end_dt.timestamp())
+        try:
+            fetched = coalesce(key, lambda: _fetch_busy(service, remote, start_dt, end_dt))
+        except CalendarUnavailable:
+            fetched = _stale_busy(remote, start_dt, end_dt)
+        for calendar_busy in fetched.values():
+            busy.extend(calendar_busy)
+    return merge_intervals(busy)
+
+def check_availability(slots: dict, calendar_ids: list = None, fresh: bool = False) -> bool:
+    """Check that every calendar in `calendar_ids` (default: the configured one) is free"""
+    logger.info("Checking availability: %s", slots)
     
     # Validate slots
     if not slots or 'start' not in slots or 'end' not in slots:
@@ -42,44 +212,40 @@ def check_availability(slots: dict) -> bool:
         return False
     
     try:
-        service, calendar_id = get_service_and_calendar_id()
-        
-        # Convert to datetime objects
-        start_dt = datetime.fromisoformat(slots['start'])
-        end_dt = datetime.fromisoformat(slots['end'])
-        
-        # Handle timezones
-        if start_dt.tzinfo is None:
-            user_tz = pytz.timezone(slots.get('timezone', 'Asia/Kolkata'))
-            start_dt = user_tz.localize(start_dt)
-            end_dt = user_tz.localize(end_dt)
-        
-        # Convert to UTC
-        start_utc = start_dt.astimezone(pytz.UTC).isoformat()
-        end_utc = end_dt.astimezone(pytz.UTC).isoformat()
-        
-        # Prepare API request
-        body = {
-            "timeMin": start_utc,
-            "timeMax": end_utc,
-            "items": [{"id": calendar_id}]
-        }
-        
-        # Execute request
-        response = service.freebusy().query(body=body).execute()
-        busy_times = response['calendars'][calendar_id].get('busy', [])
-        
-        return len(busy_times) == 0
+        start_dt, end_dt = slot_range(slots)
+        return not get_busy_intervals(start_dt, end_dt, calendar_ids, fresh)
+    except CalendarUnavailable:
+        # Not the same as busy; let the caller say Google is unreachable
+        raise
     except HttpError as e:
-        logger.error(f"Google API error: {e}")
+        logger.error("Google API error: %s", e)
     except Exception as e:
-        logger.error(f"Availability check failed: {str(e)}")
+        logger.error("Availability check failed: %s", e)
     
     return False
 
+def _event_body(slots: dict) -> dict:
+    """
+    Build the Calendar event resource for a slot. The client-chosen ID makes
+    a retried insert fail with 409 instead of creating a second event.
+    """
+    timezone = slots.get('timezone', 'UTC')
+    return {
+        'id': uuid.uuid4().hex,
+        'summary': 'Booked Appointment',
+        'start': {
+            'dateTime': slots['start'],
+            'timeZone': timezone
+        },
+        'end': {
+            'dateTime': slots['end'],
+            'timeZone': timezone
+        }
+    }
+
 def book_appointment(slots: dict) -> bool:
     """Create calendar event"""
-    logger.info(f"Booking appointment: {slots}")
+    logger.info("Booking appointment: %s", slots)
     
     # Validate slots
     if not slots or 'start' not in slots or 'end' not in slots:
@@ -90,26 +256,143 @@ def book_appointment(slots: dict) -> bool:
         # Get service and calendar ID
         service, calendar_id = get_service_and_calendar_id()
         
-        # Prepare event with timezone
-        timezone = slots.get('timezone', 'UTC')
-        event = {
-            'summary': 'Booked Appointment',
-            'start': {
-                'dateTime': slots['start'],
-                'timeZone': timezone
-            },
-            'end': {
-                'dateTime': slots['end'],
-                'timeZone': timezone
-            }
-        }
-        
         # Execute booking
-        service.events().insert(calendarId=calendar_id, body=event).execute()
+        body = _event_body(slots)
+        try:
+            created = guarded_call("insert", service.events().insert(calendarId=calendar_id, body=body).execute)
+            get_mirror(calendar_id).apply_event(created)
+        except HttpError as e:
+            if e.resp.status != 409:
+                raise
+            # An earlier attempt went through before its response was lost
+            logger.info("Event %s already exists", body['id'])
+        get_busy_cache().invalidate(calendar_id, *slot_range(slots))
         return True
+    except CalendarUnavailable:
+        raise
     except HttpError as e:
-        logger.error(f"Booking API error: {e}")
+        logger.error("Booking API error: %s", e)
     except Exception as e:
-        logger.error(f"Booking failed: {str(e)}")
+        logger.error("Booking failed: %s", e)
     
     return False
+
+def book_series(series: dict) -> bool:
+    """Create one recurring event from recurrence.build_series output."""
+    logger.info("Booking series: %s", series["recurrence"])
+    try:
+        service, calendar_id = get_service_and_calendar_id()
+        body = _event_body(series["slots"])
+        body['recurrence'] = series["recurrence"]
+        try:
+            guarded_call("insert_series", service.events().insert(calendarId=calendar_id, body=body).execute)
+        except HttpError as e:
+            if e.resp.status != 409:
+                raise
+            logger.info("Event %s already exists", body['id'])
+        # Instances are only known after expansion on Google's side
+        get_mirror(calendar_id).expire()
+        first, _ = slot_range(series["occurrences"][0])
+        _, last = slot_range(series["occurrences"][-1])
+        get_busy_cache().invalidate(calendar_id, first, last)
+        return True
+    except CalendarUnavailable:
+        raise
+    except HttpError as e:
+        logger.error("Booking API error: %s", e)
+    except Exception as e:
+        logger.error("Booking failed: %s", e)
+
+    return False
+
+def book_appointments(slots_list: list) -> list:
+    """
+    Book many slots with one busy-interval query and batched inserts.
+    Returns one result per slot, in order:
+        {"slots": ..., "status": "booked" | "busy" | "invalid" | "error",
+         "event_id": str (booked only), "error": str (error only)}
+    Each slot is claimed in the reservation store and checked against the
+    live calendar, so a slot a chat session holds or is booking comes back
+    "busy". Slots that overlap each other are booked first-come within the list.
+    """
+    logger.info("Bulk booking %d appointments", len(slots_list))
+    results = [{"slots": slots, "status": "invalid"} for slots in slots_list]
+    
+    ranges = {}
+    for i, slots in enumerate(slots_list):
+        try:
+            ranges[i] = slot_range(slots)
+        except Exception:
+            logger.error("Invalid slots for booking: %s", slots)
+    if not ranges:
+        return results
+    
+    claims = claim_ranges(ranges)
+    try:
+        _book_claimed(slots_list, ranges, claims, results)
+    finally:
+        release_slots(claims.values())
+    return results
+
+def _book_claimed(slots_list: list, ranges: dict, claims: dict, results: list) -> None:
+    for i in ranges:
+        if i not in claims:
+            results[i]["status"] = "busy"
+    if not claims:
+        return
+
+    try:
+        service, calendar_id = get_service_and_calendar_id()
+        window_start = min(ranges[i][0] for i in claims)
+        window_end = max(ranges[i][1] for i in claims)
+        busy = get_busy_intervals(window_start, window_end, fresh=True)
+    except Exception as e:
+        logger.error("Bulk availability check failed: %s", e)
+        for i in claims:
+            results[i].update(status="error", error=str(e))
+        return
+    
+    taken = IntervalIndex()
+    for n, (start, end) in enumerate(busy):
+        taken.add(f"busy-{n}", start.timestamp(), end.timestamp())
+    
+    to_insert = []
+    for i in claims:
+        start, end = ranges[i]
+        if taken.overlaps(start.timestamp(), end.timestamp()):
+            results[i]["status"] = "busy"
+            continue
+        results[i]["status"] = "pending"
+        to_insert.append(i)
+    
+    mirror = get_mirror(calendar_id)
+    cache = get_busy_cache()
+    
+    def on_insert(request_id, response, exception):
+        result = results[int(request_id)]
+        if isinstance(exception, HttpError) and exception.resp.status == 409:
+            # Inserted by an earlier attempt of a retried batch
+            result.update(status="booked", event_id=bodies[int(request_id)]['id'])
+            cache.invalidate(calendar_id, *ranges[int(request_id)])
+        elif exception is not None:
+            result.update(status="error", error=str(exception))
+        else:
+            result.update(status="booked", event_id=response.get('id'))
+            mirror.apply_event(response)
+            cache.invalidate(calendar_id, *ranges[int(request_id)])
+    
+    bodies = {i: _event_body(slots_list[i]) for i in to_insert}
+    for offset in range(0, len(to_insert), BATCH_LIMIT):
+        batch = service.new_batch_http_request(callback=on_insert)
+        for i in to_insert[offset:offset + BATCH_LIMIT]:
+            batch.add(
+                service.events().insert(calendarId=calendar_id, body=bodies[i]),
+                request_id=str(i)
+            )
+        try:
+            guarded_call("batch_insert", batch.execute)
+        except Exception as e:
+            logger.error("Batch insert failed: %s", e)
+            for i in to_insert[offset:offset + BATCH_LIMIT]:
+                if results[i]["status"] == "pending":
+                    results[i].update(status="error", error=str(e))
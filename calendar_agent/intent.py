@@ -0,0 +1,70 @@
+import bisect
+import re
+
+# Every cue the agent reacts to, as one alternation scanned in a single pass.
+# Keyword stems match whole words and their inflections ("booking", "scheduled").
+CUES = {
+    "same_time": r"same\s+time",
+    "reset": r"start\s+over|reset|begin\s+again",
+    "cancel": r"cancel|stop|never\s+mind",
+    "book": r"(?:book|schedul|appointment|meeting|reserv)\w*",
+    "listing": r"what'?s\s+(?:free|open|available)|(?:free|open)\s+(?:slots|times)|(?:this|next|coming)\s+week",
+    "availability": r"(?:free|availab|open)\w*",
+    "day": r"tomorrow|monday|tuesday|wednesday|thursday|friday|saturday|sunday",
+    "affirm": r"yes|y|yeah|sure|ok|confirm",
+    "decline": r"no|n|nope"
+}
+
+_CUE_RE = re.compile(
+    r"\b(?:" + "|".join(f"(?P<{name}>{pattern})" for name, pattern in CUES.items()) + r")\b",
+    re.IGNORECASE
+)
+_STRIP = " \t\r\n.!?,"
+# Not a word character and not matched by \s, so no cue can span two texts
+_SEPARATOR = "\x00"
+
+def _result(text: str, matches: list) -> dict:
+    result = {name: False for name in CUES}
+    for match in matches:
+        result[match.lastgroup] = True
+
+    if result["book"]:
+        result["intent"] = "book"
+    elif result["listing"]:
+        result["intent"] = "list_availability"
+    elif result["availability"]:
+        result["intent"] = "check_availability"
+    else:
+        result["intent"] = "unknown"
+
+    # A yes/no only counts as a confirmation when it is the whole reply
+    result["confirmation"] = None
+    stripped = text.strip(_STRIP)
+    if len(matches) == 1 and matches[0].group().lower() == stripped.lower():
+        if matches[0].lastgroup == "affirm":
+            result["confirmation"] = "yes"
+        elif matches[0].lastgroup in ("decline", "cancel"):
+            result["confirmation"] = "no"
+    return result
+
+def classify(text: str) -> dict:
+    """
+    Classify one utterance.
+    Returns a flag per cue in CUES, the overall 'intent' ('book',
+    'list_availability', 'check_availability' or 'unknown') and
+    'confirmation' ('yes', 'no' or None).
+    """
+    return _result(text, list(_CUE_RE.finditer(text)))
+
+def classify_batch(texts: list) -> list:
+    """Classify many utterances with one scan over the joined text; same results as classify()."""
+    offsets = []
+    position = 0
+    for text in texts:
+        offsets.append(position)
+        position += len(text) + 1
+
+    grouped = [[] for _ in texts]
+    for match in _CUE_RE.finditer(_SEPARATOR.join(texts)):
+        grouped[bisect.bisect_right(offsets, match.start()) - 1].append(match)
+    return [_result(text, matches) for text, matches in zip(texts, grouped)]
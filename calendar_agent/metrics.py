@@ -0,0 +1,196 @@
+import asyncio
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _label_text(self, key: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{value}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._label_text(key)} {value}" for key, value in items]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((key, (list(c), s, n)) for key, (c, s, n) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = self._label_text(key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = self._label_text(key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {total}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {count}")
+        return lines
+
+_registry = []
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+NODE_SECONDS = _register(Histogram(
+    "agent_node_seconds", "Time spent in each LangGraph node", ["node"]))
+PARSE_SECONDS = _register(Histogram(
+    "agent_parse_seconds",
+    "Parse time by path: grammar/fallback per extract_entities call, memo/fast/dateparser per extract_slots call",
+    ["path"]))
+CALENDAR_SECONDS = _register(Histogram(
+    "calendar_api_seconds", "Google Calendar API call time", ["call", "status"]))
+REQUEST_SECONDS = _register(Histogram(
+    "agent_request_seconds", "Backend request time", ["route"]))
+CALENDAR_DEGRADED = _register(Counter(
+    "calendar_degraded_total", "Calendar calls retried, rejected or answered from stale data", ["call", "reason"]))
+TURNS = _register(Counter(
+    "agent_turns_total", "Agent turns by recognized intent and pending state", ["intent", "waiting_for"]))
+PREFETCHES = _register(Counter(
+    "agent_prefetch_total", "Background busy-interval prefetches by outcome", ["outcome"]))
+
+# Request tracing: a sampled fraction of requests logs a per-span breakdown
+_trace_sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+def get_trace_sample_rate() -> float:
+    return _trace_sample_rate
+
+def set_trace_sample_rate(rate: float) -> None:
+    """Change the sampled fraction of traced requests at runtime (0 disables)."""
+    global _trace_sample_rate
+    _trace_sample_rate = min(max(rate, 0.0), 1.0)
+
+@contextmanager
+def trace(name: str, **attributes):
+    """Trace a request if it is sampled; spans recorded inside are logged at the end."""
+    if not _trace_sample_rate or random.random() >= _trace_sample_rate:
+        yield
+        return
+    spans = []
+    token = _current_trace.set(spans)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current_trace.reset(token)
+        logger.info("trace %s", json.dumps({
+            "name": name,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            "attributes": attributes,
+            "spans": spans
+        }, default=str))
+
+def _record_span(name: str, start: float, elapsed: float, **attributes) -> None:
+    spans = _current_trace.get()
+    if spans is not None:
+        spans.append({"name": name, "duration_ms": round(elapsed * 1000, 3), **attributes})
+
+@contextmanager
+def timed(histogram: Histogram, span: str, **labels):
+    """
+    Observe the block's duration in `histogram` and as a trace span.
+    Yields the labels dict so the block can fill in labels known only at the end.
+    """
+    start = time.perf_counter()
+    try:
+        yield labels
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed, **labels)
+        _record_span(span, start, elapsed, **labels)
+
+@contextmanager
+def calendar_call(call: str):
+    """Time a Calendar API request, labelled with its HTTP status."""
+    start = time.perf_counter()
+    status = "200"
+    try:
+        yield
+    except Exception as e:
+        status = str(getattr(getattr(e, "resp", None), "status", "error"))
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        CALENDAR_SECONDS.observe(elapsed, call=call, status=status)
+        _record_span(f"calendar.{call}", start, elapsed, status=status)
+
+def instrument_node(name: str, func):
+    """Wrap a LangGraph node (sync or async) so its run time is recorded."""
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(state):
+            with timed(NODE_SECONDS, name, node=name):
+                return await func(state)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(state):
+        with timed(NODE_SECONDS, name, node=name):
+            return func(state)
+    return wrapper
@@ -0,0 +1,213 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+import pytz
+from resilience import guarded_call
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Seconds a mirror is trusted before it needs an incremental sync
+MIRROR_MAX_AGE = float(os.getenv("CALENDAR_MIRROR_MAX_AGE", "30"))
+
+class IntervalIndex:
+    """
+    Sorted list of busy intervals keyed by event ID.
+    Times are stored as UTC epoch seconds; overlap queries are a bisect
+    plus a short backwards scan bounded by the longest stored interval.
+    """
+
+    def __init__(self):
+        self._items = []  # sorted (start, end, event_id)
+        self._by_id = {}
+        self._max_length = 0.0
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, event_id: str, start: float, end: float) -> None:
+        if event_id in self._by_id:
+            self.remove(event_id)
+        item = (start, end, event_id)
+        bisect.insort(self._items, item)
+        self._by_id[event_id] = item
+        self._max_length = max(self._max_length, end - start)
+
+    def remove(self, event_id: str) -> None:
+        item = self._by_id.pop(event_id, None)
+        if item is None:
+            return
+        pos = bisect.bisect_left(self._items, item)
+        if pos < len(self._items) and self._items[pos] == item:
+            del self._items[pos]
+
+    def clear(self) -> None:
+        self._items = []
+        self._by_id = {}
+        self._max_length = 0.0
+
+    def overlapping(self, start: float, end: float) -> list:
+        """Return (start, end) pairs overlapping [start, end), sorted by start."""
+        hi = bisect.bisect_left(self._items, (end,))
+        found = []
+        for i in range(hi - 1, -1, -1):
+            item_start, item_end, _ = self._items[i]
+            if item_start < start - self._max_length:
+                break
+            if item_end > start:
+                found.append((item_start, item_end))
+        found.reverse()
+        return found
+
+    def overlaps(self, start: float, end: float) -> bool:
+        hi = bisect.bisect_left(self._items, (end,))
+        for i in range(hi - 1, -1, -1):
+            item_start, item_end, _ = self._items[i]
+            if item_start < start - self._max_length:
+                break
+            if item_end > start:
+                return True
+        return False
+
+def _to_timestamp(dt: datetime) -> float:
+    if dt.tzinfo is None:
+        dt = pytz.UTC.localize(dt)
+    return dt.timestamp()
+
+def _event_bounds(event: dict, timezone: str):
+    """Return (start, end) epoch seconds for an event, or None if it has no times."""
+    start, end = event.get("start", {}), event.get("end", {})
+    if "dateTime" in start and "dateTime" in end:
+        return (
+            _to_timestamp(datetime.fromisoformat(start["dateTime"])),
+            _to_timestamp(datetime.fromisoformat(end["dateTime"]))
+        )
+    if "date" in start and "date" in end:
+        # All-day events are anchored to the calendar's timezone
+        tz = pytz.timezone(start.get("timeZone") or timezone)
+        return (
+            tz.localize(datetime.fromisoformat(start["date"])).timestamp(),
+            tz.localize(datetime.fromisoformat(end["date"])).timestamp()
+        )
+    return None
+
+# 403 reasons meaning we may not list the calendar's events at all; quota and
+# rate-limit 403s are temporary and must not turn the mirror off
+_NO_ACCESS_REASONS = {"forbidden", "forbiddenForNonOrganizer"}
+
+def _error_reasons(error) -> set:
+    try:
+        errors = json.loads(error.content)["error"].get("errors", [])
+    except (TypeError, ValueError, KeyError, AttributeError):
+        return set()
+    return {e.get("reason") for e in errors}
+
+def _no_access(error) -> bool:
+    """True if an HttpError says this calendar's events can never be listed by us."""
+    status = error.resp.status
+    return status == 404 or status == 403 and bool(_error_reasons(error) & _NO_ACCESS_REASONS)
+
+class CalendarMirror:
+    """
+    Local copy of one calendar's events, filled by a full events().list and
+    kept current with sync tokens. Answers busy/free questions from an
+    IntervalIndex without touching the API while it is fresh.
+    """
+
+    def __init__(self, calendar_id: str, max_age: float = MIRROR_MAX_AGE):
+        self.calendar_id = calendar_id
+        self.max_age = max_age
+        self.timezone = "UTC"
+        self.sync_token = None
+        self.synced_at = None
+        # Set when we may not list this calendar's events (free/busy access only)
+        self.unsyncable = False
+        self.index = IntervalIndex()
+        self._lock = threading.RLock()
+
+    def expire(self) -> None:
+        """Force a sync on next use, after a change that cannot be applied locally."""
+        self.synced_at = None
+
+    def is_fresh(self) -> bool:
+        return self.synced_at is not None and time.monotonic() - self.synced_at < self.max_age
+
+    def sync(self, service) -> None:
+        """Pull changes since the last sync, or everything on the first call."""
+        from googleapiclient.errors import HttpError
+        with self._lock:
+            if self.is_fresh():
+                return
+            try:
+                self._pull(service)
+            except HttpError as e:
+                if _no_access(e):
+                    self.unsyncable = True
+                if e.resp.status != 410:
+                    raise
+                # Sync token expired; start over with a full sync
+                logger.info("Sync token expired for %s, running full sync", self.calendar_id)
+                self.sync_token = None
+                self.index.clear()
+                self._pull(service)
+            self.synced_at = time.monotonic()
+
+    def _pull(self, service) -> None:
+        params = {"calendarId": self.calendar_id, "singleEvents": True, "maxResults": 2500}
+        if self.sync_token:
+            params["syncToken"] = self.sync_token
+        else:
+            params["showDeleted"] = False
+        page_token = None
+        while True:
+            if page_token:
+                params["pageToken"] = page_token
+            response = guarded_call("events_list", service.events().list(**params).execute)
+            self.timezone = response.get("timeZone", self.timezone)
+            for event in response.get("items", []):
+                self.apply_event(event)
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                self.sync_token = response.get("nextSyncToken")
+                return
+
+    def apply_event(self, event: dict) -> None:
+        """Insert, update or drop a single event as returned by the API."""
+        with self._lock:
+            event_id = event.get("id")
+            if not event_id:
+                return
+            if event.get("status") == "cancelled" or event.get("transparency") == "transparent":
+                self.index.remove(event_id)
+                return
+            bounds = _event_bounds(event, self.timezone)
+            if bounds:
+                self.index.add(event_id, *bounds)
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        with self._lock:
+            return not self.index.overlaps(_to_timestamp(start), _to_timestamp(end))
+
+    def busy_between(self, start: datetime, end: datetime) -> list:
+        """Return busy (start, end) UTC datetimes overlapping the window."""
+        with self._lock:
+            spans = self.index.overlapping(_to_timestamp(start), _to_timestamp(end))
+        return [
+            (datetime.fromtimestamp(s, pytz.UTC), datetime.fromtimestamp(e, pytz.UTC))
+            for s, e in spans
+        ]
+
+_mirrors = {}
+_mirrors_lock = threading.Lock()
+
+def get_mirror(calendar_id: str) -> CalendarMirror:
+    """Return the process-wide mirror for a calendar."""
+    with _mirrors_lock:
+        mirror = _mirrors.get(calendar_id)
+        if mirror is None:
+            mirror = _mirrors[calendar_id] = CalendarMirror(calendar_id)
+        return mirror
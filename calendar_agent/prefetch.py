@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import pytz
+from metrics import PREFETCHES
+from utils import BUSINESS_END, BUSINESS_START
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") != "0"
+PREFETCH_THREADS = int(os.getenv("PREFETCH_THREADS", "2"))
+# Windows allowed to wait for a thread; beyond this the oldest waiting one is dropped
+PREFETCH_MAX_PENDING = int(os.getenv("PREFETCH_MAX_PENDING", "32"))
+
+class Prefetcher:
+    """
+    Loads busy intervals in the background so the user's next turn is
+    answered from the backend's cache. Identical windows are queued once,
+    at most `max_pending` wait at a time, and waiting ones can be cancelled.
+    """
+
+    def __init__(self, fetch, threads: int = PREFETCH_THREADS, max_pending: int = PREFETCH_MAX_PENDING):
+        self._fetch = fetch
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="prefetch")
+        self._pending = OrderedDict()  # (start, end, calendar_ids) -> Future
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @staticmethod
+    def _key(start_dt: datetime, end_dt: datetime, calendar_ids) -> tuple:
+        return start_dt.timestamp(), end_dt.timestamp(), tuple(calendar_ids or ())
+
+    def submit(self, start_dt: datetime, end_dt: datetime, calendar_ids: list = None) -> bool:
+        """Queue a window; False if it is already queued or the prefetcher is closed."""
+        key = self._key(start_dt, end_dt, calendar_ids)
+        with self._lock:
+            if self._closed or key in self._pending:
+                return False
+            while len(self._pending) >= self.max_pending:
+                _, oldest = self._pending.popitem(last=False)
+                if oldest.cancel():
+                    PREFETCHES.inc(outcome="dropped")
+            self._pending[key] = self._executor.submit(self._run, key, start_dt, end_dt, calendar_ids)
+        PREFETCHES.inc(outcome="queued")
+        return True
+
+    def _run(self, key: tuple, start_dt: datetime, end_dt: datetime, calendar_ids: list) -> None:
+        outcome = "done"
+        try:
+            self._fetch(start_dt, end_dt, calendar_ids)
+        except Exception as e:
+            outcome = "error"
+            logger.warning("Prefetch failed: %s", e)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            PREFETCHES.inc(outcome=outcome)
+
+    def cancel(self, start_dt: datetime, end_dt: datetime, calendar_ids: list = None) -> bool:
+        """Cancel a window that has not started yet."""
+        with self._lock:
+            future = self._pending.pop(self._key(start_dt, end_dt, calendar_ids), None)
+        cancelled = future is not None and future.cancel()
+        if cancelled:
+            PREFETCHES.inc(outcome="cancelled")
+        return cancelled
+
+    def cancel_all(self) -> None:
+        with self._lock:
+            futures = list(self._pending.values())
+            self._pending.clear()
+        for future in futures:
+            if future.cancel():
+                PREFETCHES.inc(outcome="cancelled")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+        self.cancel_all()
+        self._executor.shutdown(wait=False)
+
+def _fetch(start_dt: datetime, end_dt: datetime, calendar_ids: list) -> None:
+    from calendars import get_calendar
+    get_calendar().prefetch(start_dt, end_dt, calendar_ids)
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+def get_prefetcher() -> Prefetcher:
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = Prefetcher(_fetch)
+    return _prefetcher
+
+def _business_window(first_day: datetime, last_day: datetime):
+    """Business hours from `first_day` through `last_day`, clipped to now; None if already over."""
+    now = datetime.now(first_day.tzinfo)
+    start = max(first_day.replace(hour=BUSINESS_START, minute=0, second=0, microsecond=0), now)
+    end = last_day.replace(hour=BUSINESS_END, minute=0, second=0, microsecond=0)
+    return (start, end) if start < end else None
+
+def prefetch_days(first: int, count: int = 1, calendar_ids: list = None, timezone: str = "Asia/Kolkata") -> list:
+    """
+    Prefetch business hours of `count` days starting `first` days from today,
+    as one window. Returns the queued windows as [start, end] ISO strings.
+    """
+    if not PREFETCH_ENABLED:
+        return []
+    today = datetime.now(pytz.timezone(timezone))
+    window = _business_window(today + timedelta(days=first), today + timedelta(days=first + count - 1))
+    if window and get_prefetcher().submit(*window, calendar_ids):
+        return [[window[0].isoformat(), window[1].isoformat()]]
+    return []
+
+def prefetch_slot_days(slots_list: list, calendar_ids: list = None) -> list:
+    """Prefetch business hours on each day that one of the slots falls on; returns the queued windows."""
+    if not PREFETCH_ENABLED:
+        return []
+    windows = []
+    for slots in slots_list:
+        day = datetime.fromisoformat(slots["start"])
+        window = _business_window(day, day)
+        if window and get_prefetcher().submit(*window, calendar_ids):
+            windows.append([window[0].isoformat(), window[1].isoformat()])
+    return windows
+
+def cancel_unneeded(windows: list, slots: dict, calendar_ids: list = None) -> None:
+    """Cancel the queued windows that do not contain the slot the user settled on."""
+    start = datetime.fromisoformat(slots["start"])
+    for window_start, window_end in windows:
+        start_dt, end_dt = datetime.fromisoformat(window_start), datetime.fromisoformat(window_end)
+        if not start_dt <= start < end_dt:
+            get_prefetcher().cancel(start_dt, end_dt, calendar_ids)
+
+def shutdown() -> None:
+    """Cancel queued prefetches; the next prefetch starts a new Prefetcher."""
+    global _prefetcher
+    with _prefetcher_lock:
+        prefetcher, _prefetcher = _prefetcher, None
+    if prefetcher is not None:
+        prefetcher.shutdown()
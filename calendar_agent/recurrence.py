@@ -0,0 +1,183 @@
+import os
+import re
+from datetime import datetime, timedelta
+import pytz
+from dateutil.rrule import DAILY, MONTHLY, WEEKLY, rrule
+from timeparse import WEEKDAYS, parse_entities, resolve_date
+
+# Occurrences booked when the request gives no end ("every Tuesday at 3 PM")
+RECURRENCE_DEFAULT_COUNT = int(os.getenv("RECURRENCE_DEFAULT_COUNT", "10"))
+RECURRENCE_MAX_COUNT = int(os.getenv("RECURRENCE_MAX_COUNT", "52"))
+
+_FREQ_NAMES = {DAILY: "DAILY", WEEKLY: "WEEKLY", MONTHLY: "MONTHLY"}
+_BYDAY = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+_NUMBERS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12
+}
+
+_WEEKDAY = "|".join(sorted(WEEKDAYS, key=len, reverse=True))
+_NUMBER = r"\d+|" + "|".join(_NUMBERS)
+
+_EVERY_RE = re.compile(rf"""
+    \b(?:
+        (?:every|each)\s+(?:(?P<other>other)\s+|(?P<interval>\d+)\s+)?
+        (?:
+            (?P<weekdays>(?:{_WEEKDAY})s?(?:\s*(?:,|and|&)\s*(?:{_WEEKDAY})s?)*)
+          | (?P<unit>weekday|day|week|month)s?
+        )
+      | (?P<adverb>daily|weekly|monthly)
+    )\b
+""", re.VERBOSE)
+
+# A bare "weekly"/"daily" only repeats when a time or an end sits next to it
+# ("daily at 9 am", "weekly for 6 weeks", "3 pm daily"), not in "our weekly sync"
+_ADVERB_AFTER_RE = re.compile(r"\s*(?:(?:at|from)\s+)?\d|\s*(?:for|until|till|through)\b")
+_ADVERB_BEFORE_RE = re.compile(r"(?:\d|\d\s*[ap]\.?m\.?)\s*$")
+
+_COUNT_RE = re.compile(rf"\b(?:for\s+)?(?P<count>{_NUMBER})\s+(?:times|occurrences|sessions|meetings)\b")
+_SPAN_RE = re.compile(rf"\bfor\s+(?:the\s+next\s+)?(?P<count>{_NUMBER})\s+(?P<unit>day|week|month)s?\b")
+_UNTIL_RE = re.compile(r"\b(?:until|till|through)\s+(?P<date>(?:\w+\s+){0,2}\w+?)(?=\s+at\b|\s*$|[,.])")
+
+def _number(text: str) -> int:
+    return int(text) if text.isdigit() else _NUMBERS[text]
+
+def _repeats(match, text_lower: str) -> bool:
+    if not match.group("adverb"):
+        return True
+    return bool(_ADVERB_AFTER_RE.match(text_lower, match.end())
+                or _ADVERB_BEFORE_RE.search(text_lower, 0, match.start()))
+
+def parse_recurrence(text_lower: str):
+    """
+    Recognize a repeat pattern such as "every Tuesday", "every other week",
+    "daily for 2 weeks" or "every weekday until 20 December". "Daily",
+    "weekly" and "monthly" only count next to a time or an end.
+    Returns None when the text has none, otherwise a dict with 'freq',
+    'interval', 'weekdays', the end ('count', 'span' or 'until' entity)
+    and 'rest', the text with the recurrence phrases removed.
+    """
+    # An explicit "every ..." wins over an adverb elsewhere in the text
+    matches = sorted(_EVERY_RE.finditer(text_lower), key=lambda m: bool(m.group("adverb")))
+    every = next((m for m in matches if _repeats(m, text_lower)), None)
+    if every is None:
+        return None
+    groups = every.groupdict()
+    rule = {"interval": 2 if groups["other"] else int(groups["interval"] or 1), "weekdays": [],
+            "count": None, "span": None, "until": None}
+    unit = groups["unit"] or {"daily": "day", "weekly": "week", "monthly": "month"}.get(groups["adverb"])
+    if groups["weekdays"]:
+        rule["freq"] = WEEKLY
+        names = re.findall(_WEEKDAY, groups["weekdays"])
+        rule["weekdays"] = sorted({WEEKDAYS[name] for name in names})
+    elif unit == "weekday":
+        rule["freq"] = DAILY
+        rule["weekdays"] = [0, 1, 2, 3, 4]
+    else:
+        rule["freq"] = {"day": DAILY, "week": WEEKLY, "month": MONTHLY}[unit]
+
+    spans = [every.span()]
+    count = _COUNT_RE.search(text_lower)
+    span = _SPAN_RE.search(text_lower)
+    until = _UNTIL_RE.search(text_lower)
+    if count:
+        rule["count"] = _number(count.group("count"))
+        spans.append(count.span())
+    elif span:
+        rule["span"] = (_number(span.group("count")), span.group("unit"))
+        spans.append(span.span())
+    elif until:
+        entities = parse_entities(until.group("date"))
+        if entities and entities["date"]:
+            rule["until"] = entities["date"]
+            spans.append(until.span())
+
+    rest = list(text_lower)
+    for start, end in spans:
+        rest[start:end] = " " * (end - start)
+    rule["rest"] = " ".join("".join(rest).split())
+    return rule
+
+def _until(rule: dict, start: datetime):
+    if rule["span"]:
+        count, unit = rule["span"]
+        if unit == "month":
+            month = start.month - 1 + count
+            return start.replace(year=start.year + month // 12, month=month % 12 + 1, day=1) - timedelta(seconds=1)
+        return start + timedelta(days=count * (7 if unit == "week" else 1)) - timedelta(seconds=1)
+    if rule["until"]:
+        day = resolve_date(rule["until"], start)
+        if day is not None:
+            return datetime(day.year, day.month, day.day, 23, 59, 59)
+    return None
+
+def build_series(rule: dict, slots: dict, relative_base: datetime = None) -> dict:
+    """
+    Expand a parsed rule from the slot's time of day and length.
+    Returns {"slots": first occurrence, "occurrences": [slots...],
+    "recurrence": [RRULE line], "bounded": whether the request gave an end}.
+    The RRULE always carries an explicit COUNT matching the local expansion.
+    """
+    timezone = slots.get("timezone", "Asia/Kolkata")
+    user_tz = pytz.timezone(timezone)
+    start = datetime.fromisoformat(slots["start"]).astimezone(user_tz)
+    length = datetime.fromisoformat(slots["end"]) - datetime.fromisoformat(slots["start"])
+    now = (relative_base or datetime.now(user_tz)).astimezone(user_tz)
+    dtstart = start.replace(tzinfo=None)
+    if dtstart <= now.replace(tzinfo=None):
+        # Only the time of day was given and it has passed; never start in the past
+        dtstart += timedelta(days=1)
+
+    until = _until(rule, dtstart)
+    count = rule["count"] or (None if until else RECURRENCE_DEFAULT_COUNT)
+    expansion = rrule(
+        rule["freq"],
+        dtstart=dtstart,
+        interval=rule["interval"],
+        byweekday=rule["weekdays"] or None,
+        count=min(count, RECURRENCE_MAX_COUNT) if count else None,
+        until=until
+    )
+    starts = []
+    for occurrence in expansion:
+        starts.append(occurrence)
+        if len(starts) >= RECURRENCE_MAX_COUNT:
+            break
+
+    occurrences = []
+    for naive in starts:
+        occurrence_start = user_tz.localize(naive)
+        occurrences.append({
+            "start": occurrence_start.isoformat(),
+            "end": user_tz.normalize(occurrence_start + length).isoformat(),
+            "timezone": timezone
+        })
+
+    parts = [f"FREQ={_FREQ_NAMES[rule['freq']]}"]
+    if rule["interval"] > 1:
+        parts.append(f"INTERVAL={rule['interval']}")
+    if rule["weekdays"]:
+        parts.append("BYDAY=" + ",".join(_BYDAY[day] for day in rule["weekdays"]))
+    parts.append(f"COUNT={len(occurrences)}")
+    return {
+        "slots": occurrences[0] if occurrences else None,
+        "occurrences": occurrences,
+        "recurrence": ["RRULE:" + ";".join(parts)],
+        "bounded": bool(rule["count"] or until)
+    }
+
+def exclude(series: dict, indexes: list) -> dict:
+    """Return the series without the given occurrences (an EXDATE line in the recurrence)."""
+    if not indexes:
+        return series
+    skipped = set(indexes)
+    timezone = series["slots"]["timezone"]
+    exdates = ",".join(
+        datetime.fromisoformat(series["occurrences"][i]["start"]).strftime("%Y%m%dT%H%M%S")
+        for i in sorted(skipped)
+    )
+    return dict(
+        series,
+        occurrences=[o for i, o in enumerate(series["occurrences"]) if i not in skipped],
+        recurrence=series["recurrence"] + [f"EXDATE;TZID={timezone}:{exdates}"]
+    )
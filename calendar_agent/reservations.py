@@ -0,0 +1,278 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from utils import slot_range
+
+RESERVATION_STORE = os.getenv("RESERVATION_STORE", "memory")
+RESERVATION_DB_PATH = os.getenv("RESERVATION_DB_PATH", "reservations.db")
+# How long a slot stays held while the user decides
+HOLD_TTL = float(os.getenv("RESERVATION_HOLD_TTL", "120"))
+# Upper bound on a re-check plus insert; a claim or idempotency record older
+# than this is treated as abandoned by a crashed worker
+BOOKING_TTL = float(os.getenv("RESERVATION_BOOKING_TTL", "60"))
+# How long a "booked" key keeps answering retries of the same confirmation
+KEY_TTL = float(os.getenv("RESERVATION_KEY_TTL", "3600"))
+
+def new_hold_id() -> str:
+    return uuid.uuid4().hex
+
+class MemoryReservations:
+    """
+    Per-process slot holds and idempotency records. Holds are exclusive:
+    no two live holds may overlap, so holding a range is also the lock for
+    booking it.
+    """
+
+    def __init__(self):
+        self._holds = {}  # hold_id -> (start, end, expires_at)
+        self._keys = OrderedDict()  # idempotency key -> (status, updated_at), oldest first
+        self._lock = threading.Lock()
+
+    def hold(self, start: float, end: float, ttl: float = HOLD_TTL, hold_id: str = None):
+        """Hold [start, end) for `ttl` seconds; returns the hold id, or None if it overlaps another hold."""
+        hold_id = hold_id or new_hold_id()
+        now = time.time()
+        with self._lock:
+            for other_id, (s, e, expires_at) in list(self._holds.items()):
+                if expires_at <= now:
+                    del self._holds[other_id]
+                elif other_id != hold_id and s < end and e > start:
+                    return None
+            self._holds[hold_id] = (start, end, now + ttl)
+        return hold_id
+
+    def release(self, hold_id: str) -> None:
+        with self._lock:
+            self._holds.pop(hold_id, None)
+
+    def begin(self, key: str):
+        """
+        Claim an idempotency key. Returns None if the caller should go ahead,
+        otherwise the recorded status ("booked" or "pending").
+        """
+        now = time.time()
+        with self._lock:
+            while self._keys and next(iter(self._keys.values()))[1] < now - KEY_TTL:
+                self._keys.popitem(last=False)
+            entry = self._keys.get(key)
+            if entry is None or (entry[0] == "pending" and entry[1] < now - BOOKING_TTL):
+                self._keys[key] = ("pending", now)
+                self._keys.move_to_end(key)
+                return None
+            return entry[0]
+
+    def finish(self, key: str, status: str) -> None:
+        with self._lock:
+            self._keys[key] = (status, time.time())
+            self._keys.move_to_end(key)
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            self._keys.pop(key, None)
+
+class SQLiteReservations:
+    """Slot holds and idempotency records in SQLite, shared by every worker on the machine."""
+
+    def __init__(self, path: str = RESERVATION_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS holds ("
+                "hold_id TEXT PRIMARY KEY, start REAL NOT NULL, end REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS holds_range ON holds (start, end)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS booking_keys ("
+                "key TEXT PRIMARY KEY, status TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS booking_keys_age ON booking_keys (updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode so BEGIN IMMEDIATE can take the write lock up front
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, work):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def hold(self, start: float, end: float, ttl: float = HOLD_TTL, hold_id: str = None):
+        hold_id = hold_id or new_hold_id()
+        now = time.time()
+
+        def work(conn):
+            conn.execute("DELETE FROM holds WHERE expires_at <= ?", (now,))
+            clash = conn.execute(
+                "SELECT 1 FROM holds WHERE start < ? AND end > ? AND hold_id != ? LIMIT 1",
+                (end, start, hold_id)
+            ).fetchone()
+            if clash:
+                return None
+            conn.execute(
+                "INSERT OR REPLACE INTO holds (hold_id, start, end, expires_at) VALUES (?, ?, ?, ?)",
+                (hold_id, start, end, now + ttl)
+            )
+            return hold_id
+
+        return self._transaction(work)
+
+    def release(self, hold_id: str) -> None:
+        self._connection().execute("DELETE FROM holds WHERE hold_id = ?", (hold_id,))
+
+    def begin(self, key: str):
+        now = time.time()
+
+        def work(conn):
+            conn.execute("DELETE FROM booking_keys WHERE updated_at < ?", (now - KEY_TTL,))
+            row = conn.execute("SELECT status, updated_at FROM booking_keys WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[0] == "pending" and row[1] < now - BOOKING_TTL):
+                conn.execute(
+                    "INSERT OR REPLACE INTO booking_keys (key, status, updated_at) VALUES (?, 'pending', ?)",
+                    (key, now)
+                )
+                return None
+            return row[0]
+
+        return self._transaction(work)
+
+    def finish(self, key: str, status: str) -> None:
+        self._connection().execute(
+            "UPDATE booking_keys SET status = ?, updated_at = ? WHERE key = ?", (status, time.time(), key)
+        )
+
+    def forget(self, key: str) -> None:
+        self._connection().execute("DELETE FROM booking_keys WHERE key = ?", (key,))
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_reservations():
+    """Return the configured process-wide reservation store (RESERVATION_STORE=memory|sqlite)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SQLiteReservations() if RESERVATION_STORE == "sqlite" else MemoryReservations()
+    return _store
+
+def hold_slot(slots: dict, hold_id: str = None):
+    """Hold a slot while the user confirms; returns the hold id, or None if someone else holds it."""
+    start_dt, end_dt = slot_range(slots)
+    return get_reservations().hold(start_dt.timestamp(), end_dt.timestamp(), hold_id=hold_id)
+
+def release_slot(hold_id: str) -> None:
+    if hold_id:
+        get_reservations().release(hold_id)
+
+def hold_slots(slots_list: list, ttl: float = HOLD_TTL, hold_ids: list = None):
+    """Hold every slot or none; returns the hold ids, or None if any is held by someone else."""
+    store = get_reservations()
+    held = []
+    for n, slots in enumerate(slots_list):
+        start_dt, end_dt = slot_range(slots)
+        hold_id = store.hold(start_dt.timestamp(), end_dt.timestamp(), ttl=ttl,
+                             hold_id=hold_ids[n] if hold_ids else None)
+        if hold_id is None:
+            release_slots(held)
+            return None
+        held.append(hold_id)
+    return held
+
+def claim_ranges(ranges: dict) -> dict:
+    """
+    Claim (start, end) datetime ranges for an immediate insert, as
+    book_reserved does; returns {key: hold id} for the ranges nobody else
+    holds. Overlapping ranges within `ranges` go to the first one.
+    """
+    store = get_reservations()
+    claims = {}
+    for key, (start_dt, end_dt) in ranges.items():
+        hold_id = store.hold(start_dt.timestamp(), end_dt.timestamp(), ttl=BOOKING_TTL)
+        if hold_id is not None:
+            claims[key] = hold_id
+    return claims
+
+def release_slots(hold_ids: list) -> None:
+    for hold_id in hold_ids or ():
+        release_slot(hold_id)
+
+def book_reserved(calendar, slots: dict, hold_id: str, key: str, calendar_ids: list = None) -> str:
+    """
+    Book a held slot exactly once per idempotency `key`.
+
+    The hold is turned into a short booking claim, so no other session can
+    hold or book an overlapping range while availability is re-checked and
+    the event inserted. The re-check bypasses the local mirror and busy
+    cache, which may not yet show an event another worker just inserted.
+    Returns "booked", "pending" (the same key is being
+    booked right now), "taken" or "failed". Only "booked" is remembered;
+    any other outcome can be retried with the same key.
+    """
+    store = get_reservations()
+    previous = store.begin(key)
+    if previous is not None:
+        return previous
+
+    status = "failed"
+    hold_id = hold_id or new_hold_id()
+    try:
+        start_dt, end_dt = slot_range(slots)
+        if not store.hold(start_dt.timestamp(), end_dt.timestamp(), ttl=BOOKING_TTL, hold_id=hold_id):
+            status = "taken"
+        elif not calendar.check_availability(slots, calendar_ids, fresh=True):
+            status = "taken"
+        elif calendar.book_appointment(slots):
+            status = "booked"
+    finally:
+        store.release(hold_id)
+        if status == "booked":
+            store.finish(key, status)
+        else:
+            store.forget(key)
+    return status
+
+def book_series_reserved(calendar, series: dict, hold_ids: list, key: str, calendar_ids: list = None) -> str:
+    """
+    Book a held series exactly once per idempotency `key`, as book_reserved
+    does for one slot: every occurrence is claimed, the series re-checked
+    against the live calendar and only then inserted. Returns the same
+    statuses as book_reserved.
+    """
+    store = get_reservations()
+    previous = store.begin(key)
+    if previous is not None:
+        return previous
+
+    status = "failed"
+    claimed = None
+    try:
+        claimed = hold_slots(series["occurrences"], ttl=BOOKING_TTL, hold_ids=hold_ids)
+        if claimed is None:
+            status = "taken"
+        elif calendar.find_series_conflicts(series["occurrences"], calendar_ids, fresh=True):
+            status = "taken"
+        elif calendar.book_series(series):
+            status = "booked"
+    finally:
+        release_slots(claimed or hold_ids)
+        if status == "booked":
+            store.finish(key, status)
+        else:
+            store.forget(key)
+    return status
@@ -0,0 +1,214 @@
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from metrics import CALENDAR_DEGRADED, calendar_call
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Sized to the Calendar API quota; every worker process gets its own bucket
+CALENDAR_QPS = float(os.getenv("CALENDAR_QPS", "10"))
+CALENDAR_BURST = float(os.getenv("CALENDAR_BURST", "20"))
+# Longest a call waits for a token before giving up
+RATE_LIMIT_WAIT = float(os.getenv("CALENDAR_RATE_LIMIT_WAIT", "5"))
+RETRY_ATTEMPTS = int(os.getenv("CALENDAR_RETRIES", "4"))
+RETRY_BASE = 0.25
+RETRY_CAP = 8.0
+# Consecutive failed calls that open the circuit, and how long it stays open
+BREAKER_FAILURES = int(os.getenv("CALENDAR_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("CALENDAR_BREAKER_RESET", "30"))
+# Oldest cached busy data served while Google is degraded
+STALE_MAX_AGE = float(os.getenv("CALENDAR_STALE_MAX_AGE", "900"))
+
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class CalendarUnavailable(Exception):
+    """Google Calendar is degraded: the circuit is open, or retries or the rate limit ran out."""
+
+def _status(error: Exception):
+    resp = getattr(error, "resp", None)
+    return getattr(resp, "status", None)
+
+def is_transient(error: Exception) -> bool:
+    """True for errors worth retrying: 429, 5xx, quota 403s, timeouts and dropped connections."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = _status(error)
+    if status in _RETRYABLE_STATUS:
+        return True
+    # Calendar reports some quota errors as 403 rateLimitExceeded
+    content = getattr(error, "content", None) or b""
+    return status == 403 and b"ratelimitexceeded" in content.lower()
+
+def _retry_after(error: Exception):
+    resp = getattr(error, "resp", None)
+    try:
+        return float(resp.get("retry-after")) if resp is not None and resp.get("retry-after") else None
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """Allows `rate` calls per second on average with bursts of up to `burst`."""
+
+    def __init__(self, rate: float = CALENDAR_QPS, burst: float = CALENDAR_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = RATE_LIMIT_WAIT) -> bool:
+        """Take a token, waiting up to `timeout` seconds; False if none became available."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+class CircuitBreaker:
+    """
+    Opens after `failures` consecutive failed calls and rejects calls for
+    `reset_timeout` seconds; then lets one trial call through (half-open)
+    and closes again if it succeeds.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_timeout: float = BREAKER_RESET):
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failed = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._failed = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failed += 1
+            if self.state == "half_open" or self._failed >= self.failures:
+                if self.state != "open":
+                    logger.warning("Calendar circuit opened after %d failures", self._failed)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+class SingleFlight:
+    """Runs concurrent calls with the same key once; every caller gets that result."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+_bucket = TokenBucket()
+_breaker = CircuitBreaker()
+_flights = SingleFlight()
+
+def get_breaker() -> CircuitBreaker:
+    return _breaker
+
+def coalesce(key, func):
+    """Share one in-flight `func()` between all concurrent callers using `key`."""
+    return _flights.do(key, func)
+
+def guarded_call(call: str, func):
+    """
+    Run one Calendar request under the rate limiter, circuit breaker and
+    jittered exponential backoff. Transient failures that outlast the
+    retries, an open circuit or an exhausted rate limit raise
+    CalendarUnavailable; other errors pass through unchanged.
+    """
+    for attempt in range(RETRY_ATTEMPTS + 1):
+        if not _bucket.acquire():
+            CALENDAR_DEGRADED.inc(call=call, reason="rate_limited")
+            raise CalendarUnavailable(f"Calendar {call} rate limit exceeded")
+        if not _breaker.allow():
+            CALENDAR_DEGRADED.inc(call=call, reason="circuit_open")
+            raise CalendarUnavailable(f"Calendar {call} circuit open")
+        try:
+            with calendar_call(call):
+                result = func()
+        except Exception as e:
+            if not is_transient(e):
+                # Google answered; the request itself was wrong
+                _breaker.record_success()
+                raise
+            _breaker.record_failure()
+            if attempt == RETRY_ATTEMPTS:
+                raise CalendarUnavailable(f"Calendar {call} failed: {e}") from e
+            CALENDAR_DEGRADED.inc(call=call, reason="retry")
+            delay = _retry_after(e) or random.uniform(0, min(RETRY_CAP, RETRY_BASE * 2 ** attempt))
+            logger.warning("Calendar %s failed (%s), retrying in %.2fs", call, e, delay)
+            time.sleep(min(delay, RETRY_CAP))
+            continue
+        _breaker.record_success()
+        return result
+
+# Set while a caller wants to know whether any busy data it got was stale
+_stale_reads = contextvars.ContextVar("stale_reads", default=None)
+
+@contextmanager
+def stale_reads():
+    """Yields a list that gets an entry for every stale busy read inside the block."""
+    reads = []
+    token = _stale_reads.set(reads)
+    try:
+        yield reads
+    finally:
+        _stale_reads.reset(token)
+
+def mark_stale(call: str) -> None:
+    CALENDAR_DEGRADED.inc(call=call, reason="stale")
+    reads = _stale_reads.get()
+    if reads is not None:
+        reads.append(call)
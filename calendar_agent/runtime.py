@@ -0,0 +1,99 @@
+import asyncio
+import contextvars
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Limits for the async request path, overridable from the environment
+MAX_CONCURRENCY = int(os.getenv("AGENT_MAX_CONCURRENCY", "32"))
+REQUEST_TIMEOUT = float(os.getenv("AGENT_REQUEST_TIMEOUT", "30"))
+IO_THREADS = int(os.getenv("AGENT_IO_THREADS", "16"))
+PARSE_THREADS = int(os.getenv("AGENT_PARSE_THREADS", "4"))
+
+# Blocking Calendar calls and CPU-heavy parsing get separate pools so a slow
+# Google response cannot starve parsing and vice versa
+_POOLS = {"io": (IO_THREADS, "calendar-io"), "parse": (PARSE_THREADS, "parse")}
+_executors = {}
+_executors_lock = threading.Lock()
+
+# Dropped with their event loop
+_semaphores = weakref.WeakKeyDictionary()
+
+# Receives progress events from agent code, wherever in the request it runs
+_progress_listener = contextvars.ContextVar("progress_listener", default=None)
+# Set once the caller stops waiting for the turn; pool threads keep running
+# after a timeout, so they check it before doing anything the user cannot see
+_turn_cancelled = contextvars.ContextVar("turn_cancelled", default=None)
+
+def _executor(name: str) -> ThreadPoolExecutor:
+    """Return the named pool, starting it on first use or after shutdown()."""
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                workers, prefix = _POOLS[name]
+                executor = _executors[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=prefix)
+    return executor
+
+def _run(executor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return loop.run_in_executor(executor, partial(ctx.run, func, *args, **kwargs))
+
+async def run_io(func, *args, **kwargs):
+    """Run a blocking I/O call on the bounded Calendar thread pool."""
+    return await _run(_executor("io"), func, *args, **kwargs)
+
+async def run_parse(func, *args, **kwargs):
+    """Run CPU-bound parsing off the event loop."""
+    return await _run(_executor("parse"), func, *args, **kwargs)
+
+def set_progress_listener(listener):
+    """Send progress events from this context to `listener(event, data)`; returns a reset token."""
+    return _progress_listener.set(listener)
+
+def reset_progress_listener(token) -> None:
+    """Restore the listener that was active before `set_progress_listener`."""
+    _progress_listener.reset(token)
+
+def start_turn():
+    """Give this context a fresh cancellation flag; returns (flag, reset token)."""
+    cancelled = threading.Event()
+    return cancelled, _turn_cancelled.set(cancelled)
+
+def end_turn(token) -> None:
+    _turn_cancelled.reset(token)
+
+def turn_cancelled() -> bool:
+    """True once the caller of the current turn has timed out or gone away."""
+    cancelled = _turn_cancelled.get()
+    return cancelled is not None and cancelled.is_set()
+
+def report_progress(stage: str, message: str, **data) -> None:
+    """Tell a streaming client what the agent is doing; a no-op outside streamed turns."""
+    listener = _progress_listener.get()
+    if listener is not None:
+        listener("progress", {"stage": stage, "message": message, **data})
+
+def concurrency_limit() -> asyncio.Semaphore:
+    """Return the per-event-loop semaphore bounding concurrent agent turns."""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENCY)
+    return semaphore
+
+def shutdown(wait: bool = True) -> None:
+    """
+    Stop the worker pools, letting in-flight calls finish when `wait` is set.
+    Later calls start new pools, so the process can serve another app
+    lifespan (a second TestClient, or the UI next to the embedded API).
+    """
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,53 @@
+"""
+Standalone API server for the calendar agent, independent of the Streamlit UI.
+
+    python server.py --workers 4 --host 0.0.0.0 --port 8000
+
+With more than one worker, sessions, cached busy intervals and slot holds
+default to SQLite (SESSION_STORE, BUSY_CACHE and RESERVATION_STORE set to
+sqlite) so every worker on the machine sees the same conversations, FreeBusy
+results and reservations. Each worker still keeps its own calendar mirror
+(see the README) and its own Calendar rate limiter, so CALENDAR_QPS and
+CALENDAR_BURST are split evenly between the workers. Poll /readyz before routing traffic; SIGTERM drains
+in-flight requests before exiting.
+"""
+import argparse
+import os
+import sys
+import uvicorn
+from resilience import CALENDAR_BURST, CALENDAR_QPS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("AGENT_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("AGENT_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("AGENT_WORKERS", "1")))
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("AGENT_GRACEFUL_TIMEOUT", "30")),
+                        help="seconds to let in-flight requests finish on shutdown")
+    parser.add_argument("--log-level", default=os.getenv("AGENT_LOG_LEVEL", "info"))
+    args = parser.parse_args(argv)
+
+    if args.workers > 1:
+        # Workers are separate processes; share state through SQLite by default
+        os.environ.setdefault("SESSION_STORE", "sqlite")
+        os.environ.setdefault("BUSY_CACHE", "sqlite")
+        os.environ.setdefault("RESERVATION_STORE", "sqlite")
+        # Every worker gets its own token bucket; together they stay within the quota
+        os.environ["CALENDAR_QPS"] = str(CALENDAR_QPS / args.workers)
+        os.environ["CALENDAR_BURST"] = str(max(1.0, CALENDAR_BURST / args.workers))
+
+    uvicorn.run(
+        "backend:app",
+        app_dir=HERE,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Per-turn fields that are rebuilt on every request and never need storing
+_TRANSIENT_KEYS = ("user_input", "response")
+_COMPRESS_THRESHOLD = 1024
+_RAW, _ZLIB = b"j", b"z"
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(16)
+
+def dumps_state(state: dict) -> bytes:
+    """Serialize AgentState compactly; larger states are zlib-compressed."""
+    compact = {k: v for k, v in state.items() if k not in _TRANSIENT_KEYS}
+    data = json.dumps(compact, separators=(",", ":"), default=str).encode()
+    if len(data) > _COMPRESS_THRESHOLD:
+        return _ZLIB + zlib.compress(data, 1)
+    return _RAW + data
+
+def loads_state(blob: bytes) -> dict:
+    data = blob[1:]
+    if blob[:1] == _ZLIB:
+        data = zlib.decompress(data)
+    return json.loads(data)
+
+class MemorySessionStore:
+    """In-process LRU session store bounded by TTL, entry count and bytes."""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_entries: int = SESSION_MAX_ENTRIES,
+                 max_bytes: int = SESSION_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # session_id -> (expires_at, blob)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(session_id)
+                return None
+            self._entries.move_to_end(session_id)
+            blob = entry[1]
+        return loads_state(blob)
+
+    def put(self, session_id: str, state: dict) -> None:
+        blob = dumps_state(state)
+        with self._lock:
+            self._drop(session_id)
+            self._entries[session_id] = (time.monotonic() + self.ttl, blob)
+            self._bytes += len(blob)
+            self._evict()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._drop(session_id)
+
+    def _drop(self, session_id: str) -> None:
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._entries:
+            oldest_id, (expires_at, _) = next(iter(self._entries.items()))
+            if (expires_at >= now and len(self._entries) <= self.max_entries
+                    and self._bytes <= self.max_bytes):
+                break
+            self._drop(oldest_id)
+
+class SQLiteSessionStore:
+    """SQLite-backed session store; survives restarts and is shared by workers."""
+
+    _PURGE_EVERY = 500
+
+    def __init__(self, path: str = SESSION_DB_PATH, ttl: float = SESSION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._puts = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id: str):
+        row = self._connection().execute(
+            "SELECT data FROM sessions WHERE id = ? AND expires_at >= ?",
+            (session_id, time.time())
+        ).fetchone()
+        return loads_state(row[0]) if row else None
+
+    def put(self, session_id: str, state: dict) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at",
+                (session_id, dumps_state(state), time.time() + self.ttl)
+            )
+            self._puts += 1
+            if self._puts % self._PURGE_EVERY == 0:
+                conn.execute("DELETE FROM sessions WHERE expires_at < ?", (time.time(),))
+
+    def delete(self, session_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_session_store():
+    """Return the configured process-wide session store (SESSION_STORE=memory|sqlite)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if SESSION_STORE == "sqlite":
+                    _store = SQLiteSessionStore()
+                else:
+                    _store = MemorySessionStore()
+    return _store
@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime, timedelta
+import threading
+import time
+import pytest
+import pytz
+from agent import run_agent
+from reservations import hold_slot
+from resilience import CalendarUnavailable
+
+def test_hold_released_when_calendar_unavailable(calendar, monkeypatch):
+    check_availability = calendar.check_availability
+    outage = [True]
+
+    def flaky(*args, **kwargs):
+        if outage[0]:
+            raise CalendarUnavailable("Calendar freebusy circuit open")
+        return check_availability(*args, **kwargs)
+    monkeypatch.setattr(calendar, "check_availability", flaky)
+
+    result = run_agent("Book a meeting tomorrow at 3 PM", {})
+
+    assert "isn't responding" in result["response"]
+    assert "hold_id" not in result["state"]["context"]
+    # Nobody is left holding the slot, so the retry is not told someone else is booking it
+    outage[0] = False
+    retry = run_agent("Book a meeting tomorrow at 3 PM", result["state"])
+    assert "Book it?" in retry["response"]
+
+def test_hold_kept_while_confirming(calendar):
+    result = run_agent("Book a meeting tomorrow at 3 PM", {})
+
+    assert result["state"]["context"]["hold_id"]
+    assert hold_slot(result["state"]["context"]["pending_booking"]) is None
+
+def test_timed_out_turn_does_not_book(calendar, monkeypatch):
+    import agent
+    offered = run_agent("Book a meeting tomorrow at 3 PM", {})
+    turn_features = agent._turn_features
+
+    def slow_turn_features(state):
+        # Outlive the request timeout on the I/O pool, as a slow Calendar call would
+        if threading.current_thread().name.startswith("calendar-io"):
+            time.sleep(0.1)
+        return turn_features(state)
+    monkeypatch.setattr(agent, "_turn_features", slow_turn_features)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(agent.arun_agent("yes", offered["state"], timeout=0.05))
+    pending = offered["state"]["context"]["pending_booking"]
+    # The abandoned turn gives its hold back, so the retry can take the slot
+    deadline = time.monotonic() + 2
+    while not hold_slot(pending) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert time.monotonic() < deadline
+    assert calendar.check_availability(pending)
+
+@pytest.mark.parametrize("reply, picked", [
+    ("2 pm", 1),
+    ("2:00 PM", 1),
+    ("02:00 pm", 1),
+    ("12 pm", 0),
+    ("12:00 PM", 0),
+    ("tomorrow at 2 pm", 1),
+    ("1", None),
+    ("t", None)
+])
+def test_match_suggested_slot_compares_whole_times(reply, picked):
+    from agent import _match_suggested_slot
+    from conversation import message_features
+    tz = pytz.timezone("Asia/Kolkata")
+    tomorrow = datetime.now(tz).date() + timedelta(days=1)
+    suggested = []
+    for hour in (12, 14):
+        start = tz.localize(datetime.combine(tomorrow, datetime.min.time()).replace(hour=hour))
+        suggested.append({"start": start.isoformat(), "end": (start + timedelta(minutes=30)).isoformat(),
+                          "timezone": "Asia/Kolkata"})
+    state = {
+        "user_input": reply,
+        "turn_features": message_features(reply),
+        "last_suggested_alternatives": ["tomorrow at 12:00 PM", "tomorrow at 02:00 PM"],
+        "context": {"suggested_slots": suggested}
+    }
+
+    slot = _match_suggested_slot(state)
+
+    assert slot == (suggested[picked] if picked is not None else None)
+
+def test_waiting_for_a_turn_slot_times_out(calendar, monkeypatch):
+    import agent
+    import runtime
+    monkeypatch.setattr(runtime, "MAX_CONCURRENCY", 1)
+
+    async def overloaded():
+        async with runtime.concurrency_limit():
+            with pytest.raises(asyncio.TimeoutError):
+                await agent.arun_agent("Book a meeting tomorrow at 3 PM", {}, timeout=0.05)
+
+    # Without the turn's own timeout this would wait for the slot until the outer limit
+    asyncio.run(asyncio.wait_for(overloaded(), 2))
+
+def test_state_keeps_no_per_turn_features(calendar):
+    state = {}
+    for text in ["Is Friday free?", "what about 3 pm", "no"]:
+        state = run_agent(text, state)["state"]
+    assert "history_features" not in state
+    assert len(state["conversation_history"]) == 3
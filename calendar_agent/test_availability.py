@@ -0,0 +1,37 @@
+from datetime import datetime
+import pytz
+from availability import CELLS_PER_DAY, busy_bitmap, free_blocks
+
+TZ = pytz.timezone("Asia/Kolkata")
+
+def _at(day: int, hour: int, minute: int = 0) -> datetime:
+    return TZ.localize(datetime(2025, 6, day, hour, minute))
+
+def test_busy_bitmap_marks_touched_cells():
+    origin = datetime(2025, 6, 23)
+    grid = busy_bitmap([(_at(23, 10, 5), _at(23, 10, 20)), (_at(24, 23, 50), _at(25, 0, 10))], origin, 2, TZ)
+    assert grid.shape == (2, CELLS_PER_DAY)
+    # 10:05-10:20 touches the 10:00 and 10:15 cells
+    assert list(grid[0].nonzero()[0]) == [40, 41]
+    # Clipped at the end of the grid
+    assert list(grid[1].nonzero()[0]) == [CELLS_PER_DAY - 1]
+
+def test_free_blocks_inside_business_hours():
+    busy = [(_at(23, 10), _at(23, 11)), (_at(23, 13), _at(23, 14, 30))]
+    blocks = free_blocks(busy, _at(23, 0), _at(23, 23, 59), duration=60)
+    assert [(b["start"][11:16], b["end"][11:16]) for b in blocks] == [
+        ("09:00", "10:00"), ("11:00", "13:00"), ("14:30", "18:00")
+    ]
+
+def test_free_blocks_respect_duration_and_range():
+    busy = [(_at(23, 10, 30), _at(23, 16))]
+    # 09:00-10:30 is 90 minutes; the range starts mid-cell at 09:10
+    assert free_blocks(busy, _at(23, 9, 10), _at(23, 16), duration=120) == []
+    blocks = free_blocks(busy, _at(23, 9, 10), _at(23, 16), duration=60)
+    assert [(b["start"][11:16], b["end"][11:16]) for b in blocks] == [("09:15", "10:30")]
+
+def test_free_blocks_across_days():
+    blocks = free_blocks([], _at(23, 12), _at(24, 12), duration=30)
+    assert [(b["start"][:16], b["end"][:16]) for b in blocks] == [
+        ("2025-06-23T12:00", "2025-06-23T18:00"), ("2025-06-24T09:00", "2025-06-24T12:00")
+    ]
@@ -0,0 +1,9 @@
+from fastapi.testclient import TestClient
+from backend import app
+
+def test_app_serves_again_after_lifespan_exit():
+    for _ in range(2):
+        with TestClient(app) as client:
+            assert client.get("/readyz").status_code == 200
+            resp = client.post("/chat", json={"user_input": "What's free tomorrow?"})
+            assert "Agent error" not in resp.json()["response"]
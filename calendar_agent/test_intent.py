@@ -0,0 +1,36 @@
+import pytest
+from intent import classify, classify_batch
+
+@pytest.mark.parametrize("texts", [
+    ["what's", "free"],
+    ["never", "mind"],
+    ["same", "time tomorrow"],
+    ["start", "over"],
+    ["", "yes", "", "no"],
+    ["book a meeting\nnever", "mind the gap"],
+    ["Book a meeting tomorrow at 3 PM", "What's free next week?", "yes", "Is Friday open?", "hello"]
+])
+def test_classify_batch_matches_classify(texts):
+    assert classify_batch(texts) == [classify(text) for text in texts]
+
+@pytest.mark.parametrize("text, intent, confirmation", [
+    ("Book a meeting tomorrow", "book", None),
+    ("Can you schedule something?", "book", None),
+    ("What's free next week?", "list_availability", None),
+    ("Is Friday available?", "check_availability", None),
+    ("Yes!", "unknown", "yes"),
+    ("no", "unknown", "no"),
+    ("never mind", "unknown", "no"),
+    # Only a bare yes/no is a confirmation
+    ("yes please book", "book", None),
+    ("hello", "unknown", None)
+])
+def test_classify(text, intent, confirmation):
+    result = classify(text)
+    assert (result["intent"], result["confirmation"]) == (intent, confirmation)
+
+def test_classify_flags():
+    assert classify("same time tomorrow")["same_time"]
+    assert classify("let's start over")["reset"]
+    assert classify("Bookings")["book"]
+    assert not classify("notebook")["book"]
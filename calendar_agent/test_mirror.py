@@ -0,0 +1,29 @@
+import json
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from mirror import CalendarMirror
+
+def _error(status: int, reason: str = None) -> HttpError:
+    content = {"error": {"code": status, "errors": [{"reason": reason}] if reason else []}}
+    return HttpError(httplib2.Response({"status": status}), json.dumps(content).encode())
+
+@pytest.mark.parametrize("status, reason, unsyncable", [
+    (404, "notFound", True),
+    (403, "forbidden", True),
+    (403, "forbiddenForNonOrganizer", True),
+    (403, "quotaExceeded", False),
+    (403, "dailyLimitExceeded", False),
+    (403, "rateLimitExceeded", False),
+    (403, None, False),
+])
+def test_only_access_errors_disable_the_mirror(monkeypatch, status, reason, unsyncable):
+    mirror = CalendarMirror("primary")
+
+    def fail(service):
+        raise _error(status, reason)
+    monkeypatch.setattr(mirror, "_pull", fail)
+
+    with pytest.raises(HttpError):
+        mirror.sync(None)
+    assert mirror.unsyncable is unsyncable
@@ -0,0 +1,67 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+import pytz
+import prefetch
+from prefetch import Prefetcher, cancel_unneeded
+
+TZ = pytz.timezone("Asia/Kolkata")
+
+@pytest.fixture
+def prefetcher(monkeypatch):
+    release = threading.Event()
+    fetched = []
+
+    def fetch(start_dt, end_dt, calendar_ids):
+        release.wait(5)
+        fetched.append(start_dt)
+
+    prefetcher = Prefetcher(fetch, threads=1)
+    monkeypatch.setattr(prefetch, "_prefetcher", prefetcher)
+    yield prefetcher, release, fetched
+    release.set()
+    prefetcher.shutdown()
+
+def _day(days: int) -> tuple:
+    start = TZ.localize(datetime(2025, 6, 23, 9)) + timedelta(days=days)
+    return start, start.replace(hour=18)
+
+def test_cancel_unneeded_keeps_the_chosen_day(prefetcher):
+    prefetcher, release, fetched = prefetcher
+    # Keeps the only worker busy so the windows below stay queued
+    prefetcher.submit(*_day(0))
+    windows = []
+    for days in (1, 2):
+        start, end = _day(days)
+        assert prefetcher.submit(start, end)
+        windows.append([start.isoformat(), end.isoformat()])
+
+    chosen = TZ.localize(datetime(2025, 6, 25, 15))
+    cancel_unneeded(windows, {"start": chosen.isoformat(), "end": chosen.isoformat()})
+    release.set()
+    prefetcher._executor.shutdown(wait=True)
+
+    assert fetched == [_day(0)[0], _day(2)[0]]
+
+def test_cancel_drops_a_queued_window(prefetcher):
+    prefetcher, release, fetched = prefetcher
+    assert prefetcher.submit(*_day(0))
+    assert prefetcher.submit(*_day(1))
+    assert prefetcher.cancel(*_day(1))
+    assert not prefetcher.cancel(*_day(1))
+    release.set()
+    prefetcher._executor.shutdown(wait=True)
+    assert fetched == [_day(0)[0]]
+
+def test_unknown_intent_prefetch_is_cancellable(calendar, monkeypatch):
+    import agent
+    window = [_day(1)[0].isoformat(), _day(1)[1].isoformat()]
+    monkeypatch.setattr(agent, "prefetch_days", lambda *args, **kwargs: [window])
+    cancelled = []
+    monkeypatch.setattr(agent, "cancel_unneeded", lambda windows, slots, calendar_ids: cancelled.append(windows))
+
+    asked = agent.run_agent("about my notebook", {})
+    assert asked["response"].startswith("When would you like to book?")
+    agent.run_agent("tomorrow at 3 pm", asked["state"])
+
+    assert cancelled == [[window]]
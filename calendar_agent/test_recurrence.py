@@ -0,0 +1,85 @@
+from datetime import datetime
+import pytest
+import pytz
+from dateutil.rrule import DAILY, WEEKLY
+from agent import run_agent
+from recurrence import build_series, exclude, parse_recurrence
+
+@pytest.mark.parametrize("text", [
+    "book our weekly sync tomorrow at 3 pm",
+    "schedule the monthly review on friday at 11 am",
+    "daily standup notes call tomorrow at 10 am",
+    "book a meeting tomorrow at 3 pm"
+])
+def test_one_off_wording_is_not_a_series(text):
+    assert parse_recurrence(text) is None
+
+@pytest.mark.parametrize("text, freq, rest", [
+    ("weekly at 3 pm", WEEKLY, "at 3 pm"),
+    ("book a sync daily for 2 weeks at 10 am", DAILY, "book a sync at 10 am"),
+    ("3 pm weekly", WEEKLY, "3 pm"),
+    ("every tuesday at 3 pm", WEEKLY, "at 3 pm"),
+    ("our weekly sync every tuesday at 4 pm", WEEKLY, "our weekly sync at 4 pm")
+])
+def test_recurring_wording(text, freq, rest):
+    rule = parse_recurrence(text)
+    assert rule["freq"] == freq
+    assert rule["rest"] == rest
+
+TZ = pytz.timezone("Asia/Kolkata")
+# Monday 23 June 2025, 9 AM
+BASE = TZ.localize(datetime(2025, 6, 23, 9))
+
+def _slots(day: int, hour: int) -> dict:
+    start = TZ.localize(datetime(2025, 6, day, hour))
+    end = TZ.localize(datetime(2025, 6, day, hour + 1))
+    return {"start": start.isoformat(), "end": end.isoformat(), "timezone": "Asia/Kolkata"}
+
+def test_build_series_weekly_by_day():
+    rule = parse_recurrence("every other tuesday and thursday at 3 pm for 4 weeks")
+    series = build_series(rule, _slots(24, 15), BASE)
+    starts = [o["start"][:16] for o in series["occurrences"]]
+    assert starts == ["2025-06-24T15:00", "2025-06-26T15:00", "2025-07-08T15:00", "2025-07-10T15:00"]
+    assert series["recurrence"] == ["RRULE:FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,TH;COUNT=4"]
+    assert series["slots"] == series["occurrences"][0]
+    assert series["bounded"]
+
+def test_build_series_default_count_is_unbounded():
+    series = build_series(parse_recurrence("daily at 10 am"), _slots(24, 10), BASE)
+    assert not series["bounded"]
+    assert series["recurrence"] == [f"RRULE:FREQ=DAILY;COUNT={len(series['occurrences'])}"]
+    assert series["occurrences"][1]["start"][:16] == "2025-06-25T10:00"
+
+def test_build_series_never_starts_in_the_past():
+    series = build_series(parse_recurrence("daily at 8 am for 3 days"), _slots(23, 8), BASE)
+    assert [o["start"][:10] for o in series["occurrences"]] == ["2025-06-24", "2025-06-25", "2025-06-26"]
+
+def test_exclude():
+    series = build_series(parse_recurrence("daily at 10 am for 4 days"), _slots(24, 10), BASE)
+    trimmed = exclude(series, [1, 3])
+    assert [o["start"][:10] for o in trimmed["occurrences"]] == ["2025-06-24", "2025-06-26"]
+    assert trimmed["recurrence"] == [
+        "RRULE:FREQ=DAILY;COUNT=4",
+        "EXDATE;TZID=Asia/Kolkata:20250625T100000,20250627T100000"
+    ]
+    assert exclude(series, []) is series
+
+def test_agent_books_weekly_sync_once(calendar):
+    result = run_agent("Book our weekly sync tomorrow at 3 PM", {})
+    assert "pending_booking" in result["state"]["context"]
+    assert "pending_series" not in result["state"]["context"]
+
+def test_agent_offers_series_for_recurring_wording(calendar):
+    result = run_agent("Book a sync weekly at 3 PM for 4 weeks", {})
+    assert len(result["state"]["context"]["pending_series"]["occurrences"]) == 4
+
+def test_agent_holds_series_while_confirming(calendar):
+    offered = run_agent("Book a sync weekly at 3 PM for 4 weeks", {})
+    second = datetime.fromisoformat(offered["state"]["context"]["pending_series"]["occurrences"][1]["start"])
+
+    other = run_agent(f"Book a meeting on {second.day} {second:%B} at 3 PM", {})
+    assert "Someone else is booking" in other["response"]
+
+    booked = run_agent("yes", offered["state"])
+    assert "Booked" in booked["response"]
+    assert not calendar.check_availability(booked["state"]["last_booked"])
@@ -0,0 +1,150 @@
+import threading
+import pytest
+import reservations
+from calendars import MemoryCalendarBackend
+from reservations import MemoryReservations, SQLiteReservations, book_reserved, book_series_reserved, hold_slots
+
+SLOT = {"start": "2030-01-07T15:00:00+05:30", "end": "2030-01-07T15:30:00+05:30", "timezone": "Asia/Kolkata"}
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path, monkeypatch):
+    store = MemoryReservations() if request.param == "memory" else SQLiteReservations(str(tmp_path / "r.db"))
+    monkeypatch.setattr(reservations, "_store", store)
+    return store
+
+class RecordingCalendar(MemoryCalendarBackend):
+    def __init__(self):
+        super().__init__()
+        self.checks = []
+        self.inserts = 0
+
+    def check_availability(self, slots, calendar_ids=None, fresh=False):
+        self.checks.append(fresh)
+        return super().check_availability(slots, calendar_ids, fresh)
+
+    def book_appointment(self, slots):
+        self.inserts += 1
+        return super().book_appointment(slots)
+
+    def find_series_conflicts(self, occurrences, calendar_ids=None, fresh=False):
+        self.checks.append(fresh)
+        return super().find_series_conflicts(occurrences, calendar_ids, fresh)
+
+    def book_series(self, series):
+        self.inserts += 1
+        return super().book_series(series)
+
+def test_overlapping_holds_are_exclusive(store):
+    first = store.hold(100, 200)
+    assert first
+    assert store.hold(150, 250) is None
+    assert store.hold(199, 300) is None
+    # Touching ranges do not overlap
+    assert store.hold(200, 300)
+    # Re-holding with the same id extends it
+    assert store.hold(100, 200, hold_id=first) == first
+    store.release(first)
+    assert store.hold(150, 199)
+
+def test_expired_holds_do_not_block(store):
+    assert store.hold(100, 200, ttl=-1)
+    assert store.hold(100, 200)
+
+def test_key_replay(store):
+    assert store.begin("k") is None
+    assert store.begin("k") == "pending"
+    store.finish("k", "booked")
+    assert store.begin("k") == "booked"
+    store.forget("k")
+    assert store.begin("k") is None
+
+def test_stale_pending_key_can_be_reclaimed(store, monkeypatch):
+    assert store.begin("k") is None
+    monkeypatch.setattr(reservations, "BOOKING_TTL", -1)
+    assert store.begin("k") is None
+
+def test_booked_keys_expire(store, monkeypatch):
+    store.begin("old")
+    store.finish("old", "booked")
+    monkeypatch.setattr(reservations, "KEY_TTL", -1)
+    assert store.begin("new") is None
+    # The booked key was purged, so it no longer replays
+    monkeypatch.setattr(reservations, "KEY_TTL", 3600)
+    assert store.begin("old") is None
+    if isinstance(store, MemoryReservations):
+        assert list(store._keys) == ["new", "old"]
+    else:
+        assert store._connection().execute("SELECT COUNT(*) FROM booking_keys").fetchone()[0] == 2
+
+def test_book_reserved_books_once_per_key(store):
+    calendar = RecordingCalendar()
+    assert book_reserved(calendar, SLOT, None, "key") == "booked"
+    assert book_reserved(calendar, SLOT, None, "key") == "booked"
+    assert calendar.inserts == 1
+    # The re-check inside the claim skips local caches
+    assert calendar.checks == [True]
+
+def test_book_reserved_taken(store):
+    calendar = RecordingCalendar()
+    assert book_reserved(calendar, SLOT, None, "first") == "booked"
+    assert book_reserved(calendar, SLOT, None, "second") == "taken"
+    assert calendar.inserts == 1
+
+def test_concurrent_confirmations_book_once(store):
+    calendar = RecordingCalendar()
+    calendar.latency = 0.05
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(book_reserved(calendar, SLOT, None, "key")))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calendar.inserts == 1
+    assert results.count("booked") >= 1
+    assert set(results) <= {"booked", "pending"}
+
+SERIES = {"occurrences": [
+    {"start": f"2030-01-{day:02d}T15:00:00+05:30", "end": f"2030-01-{day:02d}T15:30:00+05:30", "timezone": "Asia/Kolkata"}
+    for day in (7, 14, 21)
+]}
+
+def test_series_holds_are_all_or_nothing(store):
+    assert hold_slots(SERIES["occurrences"][1:2])
+    assert hold_slots(SERIES["occurrences"]) is None
+    # The first occurrence was not left held by the failed attempt
+    assert hold_slots(SERIES["occurrences"][:1])
+
+def test_book_series_reserved_rechecks_and_books_once(store):
+    calendar = RecordingCalendar()
+    hold_ids = hold_slots(SERIES["occurrences"])
+    assert book_series_reserved(calendar, SERIES, hold_ids, "k") == "booked"
+    assert book_series_reserved(calendar, SERIES, None, "k") == "booked"
+    assert calendar.inserts == 1
+    assert calendar.checks == [True]
+    # The holds went with the booking
+    assert hold_slots(SERIES["occurrences"])
+
+def test_book_series_reserved_taken(store):
+    calendar = RecordingCalendar()
+    hold_ids = hold_slots(SERIES["occurrences"])
+    # Booked elsewhere while the user was deciding
+    calendar.book_appointment(SERIES["occurrences"][2])
+    assert book_series_reserved(calendar, SERIES, hold_ids, "k") == "taken"
+    assert calendar.inserts == 1
+    assert hold_slots(SERIES["occurrences"][:2])
+
+def test_batch_booking_respects_holds(store):
+    calendar = MemoryCalendarBackend()
+    held = hold_slots(SERIES["occurrences"][:1])
+    overlapping = dict(SERIES["occurrences"][1], end="2030-01-14T16:00:00+05:30")
+
+    results = calendar.book_appointments(SERIES["occurrences"] + [overlapping])
+
+    assert [r["status"] for r in results] == ["busy", "booked", "booked", "busy"]
+    # The batch released its claims; only the chat session's hold remains
+    assert hold_slots(SERIES["occurrences"][1:])
+    assert hold_slots(SERIES["occurrences"][:1]) is None
+    assert held
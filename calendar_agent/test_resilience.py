@@ -0,0 +1,115 @@
+import threading
+import time
+import pytest
+import resilience
+from resilience import CalendarUnavailable, CircuitBreaker, SingleFlight, TokenBucket, guarded_call
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+def test_token_bucket_burst_then_refill(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert all(bucket.acquire(timeout=0) for _ in range(3))
+    assert not bucket.acquire(timeout=0)
+    clock.now += 0.5
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failures=3, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+def test_breaker_half_open_trial(clock):
+    breaker = CircuitBreaker(failures=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 9
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # Only one trial call while half-open
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+def test_breaker_reopens_when_trial_fails(clock):
+    breaker = CircuitBreaker(failures=3, reset_timeout=10)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+@pytest.fixture
+def guards(monkeypatch):
+    monkeypatch.setattr(resilience, "_bucket", TokenBucket(rate=100, burst=100))
+    monkeypatch.setattr(resilience, "_breaker", CircuitBreaker(failures=2, reset_timeout=60))
+    monkeypatch.setattr(resilience, "RETRY_ATTEMPTS", 1)
+    monkeypatch.setattr(resilience.time, "sleep", lambda seconds: None)
+
+def test_guarded_call_retries_then_opens(guards):
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise TimeoutError("slow")
+
+    with pytest.raises(CalendarUnavailable):
+        guarded_call("freebusy", fail)
+    assert len(calls) == 2
+    assert resilience.get_breaker().state == "open"
+    with pytest.raises(CalendarUnavailable, match="circuit open"):
+        guarded_call("freebusy", lambda: "ok")
+
+def test_guarded_call_passes_other_errors_through(guards):
+    def bad_request():
+        raise ValueError("bad")
+
+    with pytest.raises(ValueError):
+        guarded_call("insert", bad_request)
+    assert resilience.get_breaker().state == "closed"
+    assert guarded_call("insert", lambda: "ok") == "ok"
+
+def test_single_flight_shares_one_call():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "busy"
+
+    leader = threading.Thread(target=lambda: results.append(flights.do("key", slow)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flights.do("key", slow)))
+    follower.start()
+    # Give the follower time to find the leader's call and wait on it
+    time.sleep(0.05)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert results == ["busy", "busy"]
+    assert len(calls) == 1
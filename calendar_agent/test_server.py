@@ -0,0 +1,14 @@
+import os
+import server
+
+def test_workers_split_the_calendar_quota(monkeypatch):
+    for name in ("CALENDAR_QPS", "CALENDAR_BURST", "SESSION_STORE", "BUSY_CACHE", "RESERVATION_STORE"):
+        monkeypatch.delenv(name, raising=False)
+    seen = {}
+    monkeypatch.setattr(server.uvicorn, "run", lambda *args, **kwargs: seen.update(
+        qps=float(os.environ["CALENDAR_QPS"]), burst=float(os.environ["CALENDAR_BURST"])
+    ))
+
+    server.main(["--workers", "4"])
+
+    assert seen == {"qps": server.CALENDAR_QPS / 4, "burst": server.CALENDAR_BURST / 4}
@@ -0,0 +1,62 @@
+import pytest
+import sessions
+from sessions import MemorySessionStore, SQLiteSessionStore, dumps_state, loads_state
+
+STATE = {
+    "user_input": "yes",
+    "response": "✅ Booked!",
+    "waiting_for": "confirmation",
+    "context": {"pending_booking": {"start": "2030-01-07T15:00:00+05:30"}},
+    "conversation_history": ["Book a meeting tomorrow at 3 PM"]
+}
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    return MemorySessionStore() if request.param == "memory" else SQLiteSessionStore(str(tmp_path / "s.db"))
+
+def test_round_trip_drops_per_turn_fields():
+    restored = loads_state(dumps_state(STATE))
+    assert "user_input" not in restored and "response" not in restored
+    assert restored["context"] == STATE["context"]
+
+def test_large_states_are_compressed():
+    large = dict(STATE, conversation_history=["Book a meeting tomorrow at 3 PM"] * 100)
+    blob = dumps_state(large)
+    assert blob[:1] == b"z"
+    assert loads_state(blob)["conversation_history"] == large["conversation_history"]
+    assert dumps_state(STATE)[:1] == b"j"
+
+def test_store_round_trip(store):
+    assert store.get("a") is None
+    store.put("a", STATE)
+    assert store.get("a")["waiting_for"] == "confirmation"
+    store.put("a", dict(STATE, waiting_for=""))
+    assert store.get("a")["waiting_for"] == ""
+    store.delete("a")
+    assert store.get("a") is None
+
+def test_expired_sessions_are_gone(store):
+    store.ttl = -1
+    store.put("a", STATE)
+    assert store.get("a") is None
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemorySessionStore(max_entries=2)
+    store.put("a", STATE)
+    store.put("b", STATE)
+    store.get("a")
+    store.put("c", STATE)
+    assert store.get("b") is None
+    assert store.get("a") and store.get("c")
+
+def test_memory_store_bounded_by_bytes():
+    size = len(dumps_state(STATE))
+    store = MemorySessionStore(max_bytes=2 * size)
+    for session_id in "abc":
+        store.put(session_id, STATE)
+    assert store.get("a") is None
+    assert store._bytes == 2 * size
+
+def test_get_session_store_is_shared(monkeypatch):
+    monkeypatch.setattr(sessions, "_store", None)
+    assert sessions.get_session_store() is sessions.get_session_store()
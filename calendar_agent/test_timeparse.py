@@ -0,0 +1,55 @@
+from datetime import date, datetime
+import pytest
+from timeparse import mentions_date, mentions_time, parse_datetime, parse_duration, parse_entities, parse_range
+
+# Monday 23 June 2025
+BASE = datetime(2025, 6, 23, 9)
+
+@pytest.mark.parametrize("text, expected", [
+    ("tomorrow at 3 pm", datetime(2025, 6, 24, 15)),
+    ("day after tomorrow at 9:30 am", datetime(2025, 6, 25, 9, 30)),
+    ("friday at 3 pm", datetime(2025, 6, 27, 15)),
+    ("monday at 3 pm", datetime(2025, 6, 23, 15)),
+    ("next monday at 3 pm", datetime(2025, 6, 30, 15)),
+    ("tuesday next week at 9 am", datetime(2025, 7, 1, 9)),
+    ("5th of july at 2pm", datetime(2025, 7, 5, 14)),
+    ("july 5 14:30", datetime(2025, 7, 5, 14, 30)),
+    # A calendar date already past this year means next year
+    ("2 june at 10 am", datetime(2026, 6, 2, 10))
+])
+def test_parse_datetime(text, expected):
+    assert parse_datetime(text, BASE) == expected
+
+@pytest.mark.parametrize("text", ["in 3 days at 4 pm", "tomorrow", "hello", "31 february at 3 pm"])
+def test_parse_datetime_leaves_the_rest_to_dateparser(text):
+    assert parse_datetime(text, BASE) is None
+
+def test_parse_entities():
+    assert parse_entities("next friday 10:30 am") == {
+        "date": {"kind": "weekday", "weekday": 4, "modifier": "next", "next_week": False},
+        "time": (10, 30)
+    }
+    assert parse_entities("book for 2 hours") == {"date": None, "time": None}
+    # Text the grammar does not cover
+    assert parse_entities("in 3 days at 4 pm") is None
+
+@pytest.mark.parametrize("text, minutes", [
+    ("book a meeting", 30), ("for 2 hours", 120), ("an hour", 60), ("45 minutes", 45)
+])
+def test_parse_duration(text, minutes):
+    assert parse_duration(text) == minutes
+
+@pytest.mark.parametrize("text, expected", [
+    ("what's free this week", (date(2025, 6, 23), date(2025, 6, 29))),
+    ("what's free next week", (date(2025, 6, 30), date(2025, 7, 6))),
+    ("what's open on friday", (date(2025, 6, 27), date(2025, 6, 27))),
+    ("what's free", None)
+])
+def test_parse_range(text, expected):
+    assert parse_range(text, BASE) == expected
+
+def test_mentions():
+    assert mentions_time("at 3 pm") and mentions_time("at 14:30")
+    assert not mentions_time("3 people")
+    assert mentions_date("on friday") and mentions_date("5 july")
+    assert not mentions_date("fries")
@@ -0,0 +1,37 @@
+from datetime import datetime
+import pytest
+import pytz
+from utils import extract_entities, extract_slots
+
+BASE = pytz.timezone("Asia/Kolkata").localize(datetime(2025, 6, 23, 9))
+
+@pytest.mark.parametrize("text", [
+    "May I book a meeting?",
+    "I may want to book a meeting",
+    "can we march on with the booking"
+])
+def test_month_word_alone_is_not_a_date(text):
+    assert extract_slots(text, relative_base=BASE) is None
+    entities = extract_entities(text, relative_base=BASE)
+    assert entities["date"] is None and entities["time"] is None
+
+@pytest.mark.parametrize("text, start", [
+    ("book on 5 july", "2025-07-05T10:00:00+05:30"),
+    ("book on july 5th", "2025-07-05T10:00:00+05:30"),
+    ("the 2nd of may please", "2026-05-02T10:00:00+05:30"),
+    ("friday", "2025-06-27T10:00:00+05:30")
+])
+def test_date_alone_means_ten_am(text, start):
+    assert extract_slots(text, relative_base=BASE)["start"] == start
+
+def _parse_count(path: str) -> int:
+    from metrics import PARSE_SECONDS
+    entry = PARSE_SECONDS._values.get(PARSE_SECONDS._key({"path": path}))
+    return entry[2] if entry else 0
+
+def test_grammar_parses_are_timed():
+    grammar, fallback = _parse_count("grammar"), _parse_count("fallback")
+    extract_entities("tomorrow at 3 pm", relative_base=BASE)
+    assert (_parse_count("grammar"), _parse_count("fallback")) == (grammar + 1, fallback)
+    extract_entities("sometime around the 5th of july, 4ish", relative_base=BASE)
+    assert (_parse_count("grammar"), _parse_count("fallback")) == (grammar + 1, fallback + 1)
@@ -0,0 +1,204 @@
+import re
+from datetime import datetime, timedelta
+
+WEEKDAYS = {
+    "monday": 0, "mon": 0,
+    "tuesday": 1, "tue": 1, "tues": 1,
+    "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3, "thur": 3, "thurs": 3,
+    "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5,
+    "sunday": 6, "sun": 6
+}
+
+MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3,
+    "april": 4, "apr": 4, "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7,
+    "august": 8, "aug": 8, "september": 9, "sep": 9, "sept": 9,
+    "october": 10, "oct": 10, "november": 11, "nov": 11, "december": 12, "dec": 12
+}
+
+_WEEKDAY = "|".join(sorted(WEEKDAYS, key=len, reverse=True))
+_MONTH = "|".join(sorted(MONTHS, key=len, reverse=True))
+
+# One alternation for every date form the fast path understands
+_DATE_RE = re.compile(rf"""
+    \b(?:
+        (?P<relative>day\ after\ tomorrow|today|tomorrow)
+      | (?P<next_week>next\ week)
+      | (?:(?P<modifier>next|this|coming)\s+)?(?P<weekday>{_WEEKDAY})
+      | (?P<day>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<month>{_MONTH})
+      | (?P<month_first>{_MONTH})\s+(?P<day_second>\d{{1,2}})(?:st|nd|rd|th)?
+    )\b
+""", re.VERBOSE)
+
+_WEEK_RE = re.compile(r"\b(?P<which>this|next|coming)\s+week\b")
+
+_TIME_RE = re.compile(r"""
+    \b(?:
+        (?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<meridiem>a\.?m\.?|p\.?m\.?)(?![a-z])
+      | (?P<hour24>\d{1,2}):(?P<minute24>\d{2})\b
+    )
+""", re.VERBOSE)
+
+_DURATION_RE = re.compile(r"\b(?:for\s+)?(?:an?|\d+)\s*(?:hours?|hrs?|minutes?|mins?)\b")
+
+# Anything temporal left over after the known spans sends the text to dateparser
+_UNSUPPORTED_RE = re.compile(
+    r"\d|\b(?:weeks?|months?|years?|weekend|days?|ago|last|next|tonight|now|later|hence)\b"
+)
+
+_RELATIVE_DAYS = {"today": 0, "tomorrow": 1, "day after tomorrow": 2}
+
+_HOURS_RE = re.compile(r"(\d+)\s*(?:hours?|hrs?)\b")
+_MINUTES_RE = re.compile(r"(\d+)\s*(?:minutes?|mins?)\b")
+
+def named_duration(text_lower: str):
+    """Meeting length in minutes if the text names hours or minutes, else None."""
+    duration = None
+    hour_match = _HOURS_RE.search(text_lower)
+    if hour_match:
+        duration = 60 * int(hour_match.group(1))
+    elif "hour" in text_lower:
+        duration = 60
+    minutes_match = _MINUTES_RE.search(text_lower)
+    if minutes_match:
+        duration = int(minutes_match.group(1))
+    return duration
+
+def parse_duration(text_lower: str) -> int:
+    """Meeting length in minutes; 30 unless the text names hours or minutes."""
+    duration = named_duration(text_lower)
+    return 30 if duration is None else duration
+
+def parse_entities(text_lower: str):
+    """
+    Pull the date and time-of-day out of lowercase text.
+    Returns a dict with 'date' and 'time' entries (either may be None), or
+    None when the text holds something the grammar does not cover.
+    """
+    date = None
+    spans = []
+    for match in _DATE_RE.finditer(text_lower):
+        groups = match.groupdict()
+        if groups["next_week"]:
+            # "next week Tuesday" / "Tuesday next week" combine with a weekday
+            if date and date.get("kind") == "weekday" and not date.get("next_week"):
+                date["next_week"] = True
+            elif date is None:
+                date = {"kind": "next_week"}
+            else:
+                return None
+        elif date is not None and not (date["kind"] == "next_week" and groups["weekday"]):
+            return None
+        elif groups["relative"]:
+            date = {"kind": "relative", "offset": _RELATIVE_DAYS[groups["relative"]]}
+        elif groups["weekday"]:
+            date = {
+                "kind": "weekday",
+                "weekday": WEEKDAYS[groups["weekday"]],
+                "modifier": groups["modifier"],
+                "next_week": bool(date)
+            }
+        else:
+            date = {
+                "kind": "calendar",
+                "day": int(groups["day"] or groups["day_second"]),
+                "month": MONTHS[groups["month"] or groups["month_first"]]
+            }
+        spans.append(match.span())
+
+    if date and date["kind"] == "next_week":
+        return None
+
+    time_of_day = None
+    for match in _TIME_RE.finditer(text_lower):
+        if time_of_day is not None:
+            return None
+        groups = match.groupdict()
+        if groups["meridiem"]:
+            hour, minute = int(groups["hour"]), int(groups["minute"] or 0)
+            if not 1 <= hour <= 12:
+                return None
+            hour = hour % 12 + (12 if groups["meridiem"].startswith("p") else 0)
+        else:
+            hour, minute = int(groups["hour24"]), int(groups["minute24"])
+        if hour > 23 or minute > 59:
+            return None
+        time_of_day = (hour, minute)
+        spans.append(match.span())
+
+    spans.extend(m.span() for m in _DURATION_RE.finditer(text_lower))
+    residue = list(text_lower)
+    for start, end in spans:
+        residue[start:end] = " " * (end - start)
+    if _UNSUPPORTED_RE.search("".join(residue)):
+        return None
+
+    return {"date": date, "time": time_of_day}
+
+def resolve_date(date: dict, base: datetime):
+    """Turn a date entity into a calendar date relative to `base`."""
+    today = base.date()
+    if date is None:
+        return today
+    if date["kind"] == "relative":
+        return today + timedelta(days=date["offset"])
+    if date["kind"] == "absolute":
+        return today.replace(year=date["year"], month=date["month"], day=date["day"])
+    if date["kind"] == "weekday":
+        if date.get("next_week"):
+            monday = today + timedelta(days=7 - today.weekday())
+            return monday + timedelta(days=date["weekday"])
+        days_ahead = (date["weekday"] - today.weekday()) % 7
+        if days_ahead == 0 and date.get("modifier") == "next":
+            days_ahead = 7
+        return today + timedelta(days=days_ahead)
+    try:
+        resolved = today.replace(month=date["month"], day=date["day"])
+        if resolved < today:
+            resolved = resolved.replace(year=today.year + 1)
+        return resolved
+    except ValueError:
+        return None
+
+def parse_datetime(text_lower: str, base: datetime):
+    """
+    Fast-path parse of lowercase text into a naive local datetime.
+    Returns None when the grammar cannot fully account for the text.
+    """
+    entities = parse_entities(text_lower)
+    if not entities or entities["time"] is None:
+        return None
+    day = resolve_date(entities["date"], base)
+    if day is None:
+        return None
+    hour, minute = entities["time"]
+    return datetime(day.year, day.month, day.day, hour, minute)
+
+def parse_range(text_lower: str, base: datetime):
+    """
+    First and last date a listing question covers: a single day it names,
+    or this/next week (this week runs from today). None if it names neither.
+    """
+    entities = parse_entities(text_lower)
+    if entities and entities["date"]:
+        day = resolve_date(entities["date"], base)
+        if day is not None:
+            return day, day
+    match = _WEEK_RE.search(text_lower)
+    if match is None:
+        return None
+    today = base.date()
+    monday = today - timedelta(days=today.weekday())
+    if match.group("which") == "this":
+        return today, monday + timedelta(days=6)
+    return monday + timedelta(days=7), monday + timedelta(days=13)
+
+def mentions_time(text_lower: str) -> bool:
+    """True if the text names a clock time ("3 pm", "14:30")."""
+    return _TIME_RE.search(text_lower) is not None
+
+def mentions_date(text_lower: str) -> bool:
+    """True if the text names a day (relative, weekday, 'next week' or a calendar date)."""
+    return _DATE_RE.search(text_lower) is not None
@@ -1,100 +1,294 @@
+import logging
+import os
 import re
-import dateparser
-from datetime import datetime, timedelta
+import threading
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
 import pytz
+from intent import classify
+from metrics import PARSE_SECONDS, timed
+from timeparse import named_duration, parse_datetime, parse_duration, parse_entities, parse_range, resolve_date
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+BUSINESS_START = 9
+BUSINESS_END = 18
+SLOT_STEP_MINUTES = 30
+SEARCH_DAYS = 2
+PARSE_CACHE_SIZE = 2048
+PARSER_LANGUAGES = os.getenv("PARSER_LANGUAGES", "en").split(",")
 
 def get_user_intent(text: str) -> str:
-    text = text.lower()
-    if any(word in text for word in ["book", "schedule", "appointment", "meeting", "reserve"]):
-        return "book"
-    if any(word in text for word in ["free", "available", "availability", "open"]):
-        return "check_availability"
-    return "unknown"
-
-def extract_slots(text: str, timezone: str = "Asia/Kolkata") -> dict:
-    """Improved slot extraction that handles natural language like 'I want to book 2 July at 2 PM'"""
-    user_tz = pytz.timezone(timezone)
-    original_text = text.strip()
-    text_lower = original_text.lower()
-
-    # Map vague terms to times
-    time_map = {
-        "morning": "10:00 AM",
-        "afternoon": "2:00 PM",
-        "evening": "5:00 PM",
-        "night": "7:00 PM",
-        "noon": "12:00 PM",
-        "midnight": "12:00 AM"
-    }
-    for term, tm in time_map.items():
-        if term in text_lower:
-            original_text = re.sub(term, tm, original_text, flags=re.IGNORECASE)
-            break
+    return classify(text)["intent"]
+
+_TIME_MAP = {
+    "morning": "10:00 am",
+    "afternoon": "2:00 pm",
+    "evening": "5:00 pm",
+    "night": "7:00 pm",
+    "noon": "12:00 pm",
+    "midnight": "12:00 am"
+}
+_MONTHS = r"(?:january|february|march|april|may|june|july|august|september|october|november|december)"
+# A month only names a date next to a day number: "may I book" and "march" alone do not
+_DATE_ONLY_RE = re.compile(
+    r"\b(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b"
+    rf"|\b\d{{1,2}}(?:st|nd|rd|th)?\s+(?:of\s+)?{_MONTHS}\b|\b{_MONTHS}\s+\d{{1,2}}(?:st|nd|rd|th)?\b"
+)
+_EXPLICIT_TIME_RE = re.compile(r"\d\s*(?:am|pm)\b|\d:\d\d")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+def _expand_times(text: str) -> str:
+    """Lowercase, collapse whitespace and expand vague times like 'morning'."""
+    text = _WHITESPACE_RE.sub(" ", text.strip().lower()).strip(" .!?")
+    for term, tm in _TIME_MAP.items():
+        if term in text:
+            return text.replace(term, tm)
+    return text
+
+def _normalize(text: str) -> str:
+    text = _expand_times(text)
 
     # Ensure there's a time if only a date is mentioned
-    if not any(marker in text_lower for marker in ["am", "pm", ":", "hour", "minute"]):
-        if any(day in text_lower for day in ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]) or "july" in text_lower or "august" in text_lower:
-            original_text += " 10:00 AM"
+    if not any(marker in text for marker in ["am", "pm", ":", "hour", "minute"]):
+        if _DATE_ONLY_RE.search(text):
+            text += " 10:00 am"
+    return text
+
+def _parse_start(text: str, user_tz, base: datetime, labels: dict):
+    """Parse normalized text into an aware start time, grammar first."""
+    parsed = parse_datetime(text, base)
+    if parsed is not None:
+        labels["path"] = "fast"
+        return user_tz.localize(parsed)
 
-    # Try parsing directly with fallback to RELATIVE_BASE
+    labels["path"] = "dateparser"
+
+    import dateparser
     parsed = dateparser.parse(
-        original_text,
+        text,
+        languages=PARSER_LANGUAGES,
         settings={
-            "TIMEZONE": timezone,
+            "TIMEZONE": user_tz.zone,
             "RETURN_AS_TIMEZONE_AWARE": True,
             "PREFER_DATES_FROM": "future",
-            "RELATIVE_BASE": datetime.now(user_tz)
+            # dateparser rejects aware relative bases
+            "RELATIVE_BASE": base.replace(tzinfo=None)
         }
     )
-
     if not parsed:
-        print(f"[ERROR] Failed to parse: '{original_text}'")
         return None
+    if parsed.tzinfo is None:
+        return user_tz.localize(parsed)
+    return parsed.astimezone(user_tz)
+
+def extract_slots(text: str, timezone: str = "Asia/Kolkata", relative_base: datetime = None) -> dict:
+    """Improved slot extraction that handles natural language like 'I want to book 2 July at 2 PM'"""
+    user_tz = pytz.timezone(timezone)
+    base = relative_base.astimezone(user_tz) if relative_base else datetime.now(user_tz)
+    normalized = _normalize(text)
 
-    # Default duration logic
-    duration = 30
-    if "hour" in text_lower:
-        hour_match = re.search(r'(\d+)\s*hour', text_lower)
-        duration = 60 * int(hour_match.group(1)) if hour_match else 60
-    minutes_match = re.search(r"(\d+)\s*minute", text_lower)
-    if minutes_match:
-        duration = int(minutes_match.group(1))
+    # Results only depend on the base date once an explicit time is given
+    base_key = base.date() if _EXPLICIT_TIME_RE.search(normalized) else base.replace(second=0, microsecond=0)
+    key = (normalized, timezone, base_key)
+    with timed(PARSE_SECONDS, "extract_slots", path="memo") as labels:
+        with _memo_lock:
+            if key in _memo:
+                _memo.move_to_end(key)
+                slots = _memo[key]
+                return dict(slots) if slots else None
 
-    # Final formatting
-    if parsed.tzinfo is None:
-        start = user_tz.localize(parsed)
+        start = _parse_start(normalized, user_tz, base, labels)
+    if start is None:
+        logger.info("Failed to parse: %r", normalized)
+        slots = None
     else:
-        start = parsed.astimezone(user_tz)
-    end = start + timedelta(minutes=duration)
+        end = start + timedelta(minutes=parse_duration(normalized))
+        slots = {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "timezone": timezone
+        }
+
+    with _memo_lock:
+        _memo[key] = slots
+        if len(_memo) > PARSE_CACHE_SIZE:
+            _memo.popitem(last=False)
+    return dict(slots) if slots else None
+
+def extract_entities(text: str, timezone: str = "Asia/Kolkata", relative_base: datetime = None,
+                     fallback: bool = True) -> dict:
+    """
+    Temporal entities of one message, parsed once: 'date' (a timeparse date
+    entity), 'time' ((hour, minute)) and 'duration' (minutes), each None
+    when the message leaves it out. Text the grammar cannot cover goes to
+    dateparser (unless `fallback` is off) and comes back as an absolute
+    date and time.
+    """
+    with timed(PARSE_SECONDS, "extract_entities", path="grammar") as labels:
+        lower = _expand_times(text)
+        entities = parse_entities(lower)
+        if entities is None or not (entities["date"] or entities["time"]) and _DATE_ONLY_RE.search(lower):
+            labels["path"] = "fallback"
+            entities = {"date": None, "time": None}
+            slots = extract_slots(text, timezone, relative_base) if fallback else None
+            if slots:
+                start = datetime.fromisoformat(slots["start"])
+                entities["date"] = {"kind": "absolute", "year": start.year, "month": start.month, "day": start.day}
+                entities["time"] = (start.hour, start.minute)
+        entities["duration"] = named_duration(lower)
+    return entities
 
+def merge_entities(entities: dict, prior_date: dict = None) -> dict:
+    """Resolve a follow-up time ("3 PM" after "Friday?") by borrowing the date it leaves out."""
+    if entities["date"] or entities["time"] is None or not prior_date:
+        return entities
+    return dict(entities, date=prior_date)
+
+def resolve_entities(entities: dict, timezone: str = "Asia/Kolkata", relative_base: datetime = None):
+    """
+    Turn entities into a slots dict, or None if they name neither a date nor
+    a time. A date alone means 10 AM; a time alone means today.
+    """
+    if not (entities["date"] or entities["time"]):
+        return None
+    user_tz = pytz.timezone(timezone)
+    base = relative_base.astimezone(user_tz) if relative_base else datetime.now(user_tz)
+    try:
+        day = resolve_date(entities["date"], base)
+    except ValueError:
+        day = None
+    if day is None:
+        return None
+    hour, minute = entities["time"] or (10, 0)
+    start = user_tz.localize(datetime(day.year, day.month, day.day, hour, minute))
+    end = user_tz.normalize(start + timedelta(minutes=entities.get("duration") or 30))
     return {
         "start": start.isoformat(),
         "end": end.isoformat(),
         "timezone": timezone
     }
 
+def move_to_date(slots: dict, date: dict, relative_base: datetime = None) -> dict:
+    """Same time of day and length as `slots`, on the day a date entity names."""
+    user_tz = pytz.timezone(slots.get("timezone", "Asia/Kolkata"))
+    start, end = slot_range(slots)
+    start = start.astimezone(user_tz)
+    base = relative_base.astimezone(user_tz) if relative_base else datetime.now(user_tz)
+    day = resolve_date(date, base)
+    if day is None:
+        return dict(slots)
+    moved = user_tz.localize(datetime.combine(day, start.time()))
+    return dict(
+        slots,
+        start=moved.isoformat(),
+        end=user_tz.normalize(moved + (end - start)).isoformat()
+    )
+
+def slot_range(slots: dict) -> tuple:
+    """Return timezone-aware start and end datetimes for a slot dict."""
+    start_dt = datetime.fromisoformat(slots["start"])
+    end_dt = datetime.fromisoformat(slots["end"])
+    if start_dt.tzinfo is None:
+        user_tz = pytz.timezone(slots.get("timezone", "Asia/Kolkata"))
+        start_dt = user_tz.localize(start_dt)
+        end_dt = user_tz.localize(end_dt)
+    return start_dt, end_dt
+
 def is_business_hours(slots: dict) -> bool:
     try:
         start_dt = datetime.fromisoformat(slots["start"])
-        return 9 <= start_dt.hour < 18
+        return BUSINESS_START <= start_dt.hour < BUSINESS_END
     except:
         return True
 
-def suggest_alternative(slots: dict) -> str:
-    try:
-        start_dt = datetime.fromisoformat(slots["start"])
-        business_start = 9
-        business_end = 18
+def merge_intervals(intervals: list) -> list:
+    """Merge overlapping or touching (start, end) intervals into a sorted list."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
 
-        if start_dt.hour < business_start or start_dt.hour >= business_end:
-            next_day = start_dt + timedelta(days=1)
-            return f"{next_day.strftime('%A')} morning or afternoon"
+def search_window(anchor: datetime, days: int = SEARCH_DAYS) -> tuple:
+    """Return the (start, end) window searched for alternatives around `anchor`."""
+    now = datetime.now(anchor.tzinfo)
+    day_start = max(anchor, now).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(day_start, now), day_start + timedelta(days=days + 1)
 
-        alt1 = start_dt + timedelta(hours=1)
-        alt2 = start_dt + timedelta(hours=2)
-        return f"{alt1.strftime('%I:%M %p')} or {alt2.strftime('%I:%M %p')}"
-    except Exception:
-        return "tomorrow morning or afternoon"
+def listing_window(text: str, timezone: str = "Asia/Kolkata", relative_base: datetime = None) -> tuple:
+    """
+    Return the (start, end) a listing question such as "what's free next
+    week?" covers: business hours of the days it names, or of the next
+    SEARCH_DAYS days, starting no earlier than now.
+    """
+    user_tz = pytz.timezone(timezone)
+    now = relative_base or datetime.now(user_tz)
+    first, last = parse_range(text.lower(), now) or (now.date(), now.date() + timedelta(days=SEARCH_DAYS))
+    start = max(user_tz.localize(datetime.combine(first, time(BUSINESS_START))), now)
+    end = user_tz.localize(datetime.combine(last, time(BUSINESS_END)))
+    return start, end
+
+def _align(dt: datetime, step: timedelta) -> datetime:
+    """Round `dt` up to the next step boundary counted from its midnight."""
+    midnight = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    remainder = (dt - midnight) % step
+    return dt if not remainder else dt + (step - remainder)
+
+def find_free_slots(busy: list, window_start: datetime, window_end: datetime,
+                    duration: int = 30, count: int = 2, anchor: datetime = None,
+                    timezone: str = "Asia/Kolkata") -> list:
+    """
+    Walk the gaps between merged busy intervals inside business hours and
+    return the `count` free slots of `duration` minutes nearest to `anchor`.
+    """
+    user_tz = pytz.timezone(timezone)
+    window_start = window_start.astimezone(user_tz)
+    window_end = window_end.astimezone(user_tz)
+    anchor = (anchor or window_start).astimezone(user_tz)
+    length = timedelta(minutes=duration)
+    step = timedelta(minutes=SLOT_STEP_MINUTES)
+    merged = merge_intervals(busy)
+
+    candidates = []
+    i = 0
+    day = window_start.date()
+    while day <= window_end.date():
+        open_at = max(user_tz.localize(datetime.combine(day, time(BUSINESS_START))), window_start)
+        close_at = min(user_tz.localize(datetime.combine(day, time(BUSINESS_END))), window_end)
+        cursor = _align(open_at, step)
+        while cursor + length <= close_at:
+            while i < len(merged) and merged[i][1] <= cursor:
+                i += 1
+            if i < len(merged) and merged[i][0] < cursor + length:
+                cursor = _align(merged[i][1].astimezone(user_tz), step)
+                continue
+            if cursor != anchor:
+                candidates.append(cursor)
+            cursor = user_tz.normalize(cursor + step)
+        day += timedelta(days=1)
+
+    nearest = sorted(candidates, key=lambda c: (abs(c - anchor), c))[:count]
+    return [
+        {
+            "start": start.isoformat(),
+            "end": (start + length).isoformat(),
+            "timezone": timezone
+        }
+        for start in sorted(nearest)
+    ]
+
+def suggest_alternative(free_slots: list) -> str:
+    if not free_slots:
+        return "another day"
+    return " or ".join(_format_time_friendly(slot["start"]) for slot in free_slots)
 
 def _format_time_friendly(datetime_str: str) -> str:
     try:
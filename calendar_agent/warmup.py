@@ -0,0 +1,46 @@
+import logging
+import os
+import time
+from calendars import get_calendar
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Opt-in: spend startup time so the first turn on a new worker is not the slow one
+WARMUP = os.getenv("AGENT_WARMUP", "0") == "1"
+
+# Cover the grammar, recurrence and listing paths plus one dateparser fallback
+_SAMPLES = (
+    "Book a meeting tomorrow at 3 PM",
+    "Every Tuesday at 10:30 AM for 4 weeks",
+    "What's free next week for 2 hours?",
+    "Can we meet in 3 days at 4 pm?"
+)
+
+def warm_up() -> dict:
+    """
+    Load what the first request would otherwise pay for: dateparser's locale
+    data and regexes, the availability bitmap code and the Calendar client
+    with its access token. Returns seconds spent per stage.
+    """
+    timings = {}
+    start = time.perf_counter()
+    from conversation import message_features
+    for text in _SAMPLES:
+        message_features(text)
+    timings["parsers"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    import availability  # noqa: F401
+    timings["availability"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        get_calendar().warm_up()
+    except Exception as e:
+        # Not fatal: the first request builds the client again
+        logger.warning("Calendar warm-up failed: %s", e)
+    timings["calendar"] = time.perf_counter() - start
+
+    logger.info("Warm-up done: %s", ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in timings.items()))
+    return timings